@@ -1,29 +1,29 @@
-from rlm import RLM
-from rlm.logger import RLMLogger
+import asyncio
 import json
 
-# 创建日志记录器
-logger = RLMLogger(log_dir="./logs")
+from rlm import RLM
+from rlm.logger import RLMLogger
 
 # 从配置文件读取 DeepSeek API 配置
-with open('config.json', 'r', encoding='utf-8') as f:
+with open('config.json', encoding='utf-8') as f:
     config = json.load(f)
 
 # 初始化 RLM，使用 DeepSeek 作为后端模型
-rlm = RLM(
-    backend="openai",
-    backend_kwargs={
-        "model_name": config['deepseek_model'],
-        "api_key": config['deepseek_api_key'],
-        "base_url": config['deepseek_base_url']
-    },
-    environment="local",
-    environment_kwargs={},
-    max_depth=1,
-    max_iterations=5,
-    logger=logger,
-    verbose=True,
-)
+def make_rlm(logger):
+    return RLM(
+        backend="openai",
+        backend_kwargs={
+            "model_name": config['deepseek_model'],
+            "api_key": config['deepseek_api_key'],
+            "base_url": config['deepseek_base_url']
+        },
+        environment="local",
+        environment_kwargs={},
+        max_depth=1,
+        max_iterations=5,
+        logger=logger,
+        verbose=True,
+    )
 
 print("RLM 中文演示开始...")
 
@@ -47,18 +47,36 @@ test_cases = [
     }
 ]
 
-# 运行测试用例
-for i, test_case in enumerate(test_cases, 1):
+# 每个测试用例使用独立的日志记录器（各自一个日志文件），并发运行时日志不会混在一起
+loggers = [
+    RLMLogger(log_dir="./logs", file_name=f"rlm_case{i}")
+    for i in range(1, len(test_cases) + 1)
+]
+
+# 并发运行测试用例：每个 acompletion() 拥有独立的环境，网络往返相互重叠
+async def run_all():
+    return await asyncio.gather(
+        *[
+            make_rlm(logger).acompletion(test_case['prompt'])
+            for test_case, logger in zip(test_cases, loggers, strict=True)
+        ],
+        return_exceptions=True,
+    )
+
+results = asyncio.run(run_all())
+for logger in loggers:
+    logger.close()
+
+for i, (test_case, result) in enumerate(zip(test_cases, results, strict=True), 1):
     print(f"\n{'='*60}")
     print(f"测试用例 {i}: {test_case['name']}")
     print(f"{'='*60}")
-    
-    try:
-        result = rlm.completion(test_case['prompt'])
+
+    if isinstance(result, Exception):
+        print(f"\n测试过程中遇到错误: {result}")
+    else:
         print("\n测试成功！结果:")
         print(result.response)
-    except Exception as e:
-        print(f"\n测试过程中遇到错误: {e}")
 
 print(f"\n{'='*60}")
 print("所有测试用例执行完成！")
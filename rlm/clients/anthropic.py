@@ -65,8 +65,13 @@ class AnthropicClient(BaseLM):
 
     def _prepare_messages(
         self, prompt: str | list[dict[str, Any]]
-    ) -> tuple[list[dict[str, Any]], str | None]:
-        """Prepare messages and extract system prompt for Anthropic API."""
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]] | None]:
+        """Prepare messages and extract system prompt for Anthropic API.
+
+        The system prompt is sent as a text block marked with an ephemeral `cache_control`,
+        so the static RLM system prompt is served from the prompt cache on every iteration
+        after the first.
+        """
         system = None
 
         if isinstance(prompt, str):
@@ -76,7 +81,13 @@ class AnthropicClient(BaseLM):
             messages = []
             for msg in prompt:
                 if msg.get("role") == "system":
-                    system = msg.get("content")
+                    system = [
+                        {
+                            "type": "text",
+                            "text": msg.get("content"),
+                            "cache_control": {"type": "ephemeral"},
+                        }
+                    ]
                 else:
                     messages.append(msg)
         else:
@@ -85,14 +96,22 @@ class AnthropicClient(BaseLM):
         return messages, system
 
     def _track_cost(self, response: anthropic.types.Message, model: str):
+        # Cached prompt tokens are reported separately from input_tokens; count them as input.
+        usage = response.usage
+        input_tokens = (
+            usage.input_tokens
+            + (usage.cache_creation_input_tokens or 0)
+            + (usage.cache_read_input_tokens or 0)
+        )
+
         self.model_call_counts[model] += 1
-        self.model_input_tokens[model] += response.usage.input_tokens
-        self.model_output_tokens[model] += response.usage.output_tokens
-        self.model_total_tokens[model] += response.usage.input_tokens + response.usage.output_tokens
+        self.model_input_tokens[model] += input_tokens
+        self.model_output_tokens[model] += usage.output_tokens
+        self.model_total_tokens[model] += input_tokens + usage.output_tokens
 
         # Track last call for handler to read
-        self.last_prompt_tokens = response.usage.input_tokens
-        self.last_completion_tokens = response.usage.output_tokens
+        self.last_prompt_tokens = input_tokens
+        self.last_completion_tokens = usage.output_tokens
 
     def get_usage_summary(self) -> UsageSummary:
         model_summaries = {}
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Any
 
 from rlm.core.types import UsageSummary
@@ -22,6 +23,13 @@ class BaseLM(ABC):
     async def acompletion(self, prompt: str | dict[str, Any]) -> str:
         raise NotImplementedError
 
+    def stream_completion(self, prompt: str | dict[str, Any]) -> Iterator[str]:
+        """
+        逐片段返回响应。默认实现不流式，一次性返回完整响应；
+        支持流式输出的客户端应覆盖此方法。
+        """
+        yield self.completion(prompt)
+
     @abstractmethod
     def get_usage_summary(self) -> UsageSummary:
         """获取所有模型调用的成本摘要。"""
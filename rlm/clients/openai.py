@@ -1,5 +1,9 @@
+import importlib.util
 import os
+import threading
+import warnings
 from collections import defaultdict
+from collections.abc import Iterator
 from typing import Any
 
 import openai
@@ -16,6 +20,25 @@ DEFAULT_OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 DEFAULT_VERCEL_API_KEY = os.getenv("AI_GATEWAY_API_KEY")
 DEFAULT_PRIME_INTELLECT_BASE_URL = "https://api.pinference.ai/api/v1/"
 
+# HTTP/2 multiplexes concurrent sub-calls over one connection, but needs the optional `h2` package
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+_shared_http_client = None
+_shared_http_client_lock = threading.Lock()
+
+
+def _get_shared_http_client():
+    """
+    Return the process-wide sync HTTP client. A new OpenAIClient is created for every
+    completion, so sharing the connection pool keeps connections alive across completions
+    and saves the TCP+TLS handshake on each one.
+    """
+    global _shared_http_client
+    with _shared_http_client_lock:
+        if _shared_http_client is None:
+            _shared_http_client = openai.DefaultHttpxClient(http2=_HTTP2)
+        return _shared_http_client
+
 
 class OpenAIClient(BaseLM):
     """
@@ -40,8 +63,15 @@ class OpenAIClient(BaseLM):
                 api_key = DEFAULT_VERCEL_API_KEY
 
         # For vLLM, set base_url to local vLLM server address.
-        self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
-        self.async_client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.client = openai.OpenAI(
+            api_key=api_key, base_url=base_url, http_client=_get_shared_http_client()
+        )
+        # Async clients are bound to the event loop they first run on, so they aren't shared
+        self.async_client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=openai.DefaultAsyncHttpxClient(http2=_HTTP2),
+        )
         self.model_name = model_name
 
         # Per-model usage tracking
@@ -50,7 +80,10 @@ class OpenAIClient(BaseLM):
         self.model_output_tokens: dict[str, int] = defaultdict(int)
         self.model_total_tokens: dict[str, int] = defaultdict(int)
 
-    def completion(self, prompt: str | list[dict[str, Any]], model: str | None = None) -> str:
+    def _prepare_request(
+        self, prompt: str | list[dict[str, Any]], model: str | None
+    ) -> tuple[list[dict[str, Any]], str, dict[str, Any]]:
+        """Build the messages, model name and extra body for a chat completion request."""
         if isinstance(prompt, str):
             messages = [{"role": "user", "content": prompt}]
         elif isinstance(prompt, list) and all(isinstance(item, dict) for item in prompt):
@@ -66,6 +99,11 @@ class OpenAIClient(BaseLM):
         if self.client.base_url == DEFAULT_PRIME_INTELLECT_BASE_URL:
             extra_body["usage"] = {"include": True}
 
+        return messages, model, extra_body
+
+    def completion(self, prompt: str | list[dict[str, Any]], model: str | None = None) -> str:
+        messages, model, extra_body = self._prepare_request(prompt, model)
+
         response = self.client.chat.completions.create(
             model=model, messages=messages, extra_body=extra_body
         )
@@ -75,20 +113,7 @@ class OpenAIClient(BaseLM):
     async def acompletion(
         self, prompt: str | list[dict[str, Any]], model: str | None = None
     ) -> str:
-        if isinstance(prompt, str):
-            messages = [{"role": "user", "content": prompt}]
-        elif isinstance(prompt, list) and all(isinstance(item, dict) for item in prompt):
-            messages = prompt
-        else:
-            raise ValueError(f"Invalid prompt type: {type(prompt)}")
-
-        model = model or self.model_name
-        if not model:
-            raise ValueError("Model name is required for OpenAI client.")
-
-        extra_body = {}
-        if self.client.base_url == DEFAULT_PRIME_INTELLECT_BASE_URL:
-            extra_body["usage"] = {"include": True}
+        messages, model, extra_body = self._prepare_request(prompt, model)
 
         response = await self.async_client.chat.completions.create(
             model=model, messages=messages, extra_body=extra_body
@@ -96,6 +121,40 @@ class OpenAIClient(BaseLM):
         self._track_cost(response, model)
         return response.choices[0].message.content
 
+    def stream_completion(
+        self, prompt: str | list[dict[str, Any]], model: str | None = None
+    ) -> Iterator[str]:
+        messages, model, extra_body = self._prepare_request(prompt, model)
+
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            extra_body=extra_body,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        # Usage arrives on the final chunk (which has no choices)
+        usage_chunk = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage_chunk = chunk
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+        # Some OpenAI-compatible servers ignore stream_options and never send usage. By now the
+        # response has been consumed and its code blocks executed, so raising would throw away
+        # a finished iteration: the call is counted without tokens and a warning is emitted.
+        if usage_chunk is None:
+            warnings.warn(
+                f"No usage data in the streamed response from {model}; its tokens are not counted.",
+                stacklevel=2,
+            )
+            self.model_call_counts[model] += 1
+            self.last_prompt_tokens = 0
+            self.last_completion_tokens = 0
+            return
+        self._track_cost(usage_chunk, model)
+
     def _track_cost(self, response: openai.ChatCompletion, model: str):
         self.model_call_counts[model] += 1
 
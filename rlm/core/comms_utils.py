@@ -3,11 +3,14 @@ Communication utilities for RLM socket protocol.
 
 Protocol: 4-byte big-endian length prefix + JSON payload.
 Used for communication between LMHandler and environment subprocesses.
+Connections may carry any number of request/response pairs; the handler serves a
+connection until the client closes it.
 """
 
 import json
 import socket
 import struct
+import threading
 from dataclasses import dataclass
 from typing import Any
 
@@ -149,6 +152,21 @@ def socket_send(sock: socket.socket, data: dict) -> None:
     sock.sendall(struct.pack(">I", len(payload)) + payload)
 
 
+def _recv_exact(sock: socket.socket, length: int) -> bytes | None:
+    """Read exactly `length` bytes. Returns None if the peer closed before sending any."""
+    buf = bytearray(length)
+    view = memoryview(buf)
+    received = 0
+    while received < length:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed before message complete")
+        received += n
+    return bytes(buf)
+
+
 def socket_recv(sock: socket.socket) -> dict:
     """Receive a length-prefixed JSON message from socket.
 
@@ -158,19 +176,16 @@ def socket_recv(sock: socket.socket) -> dict:
     Raises:
         ConnectionError: If connection closes mid-message.
     """
-    raw_len = sock.recv(4)
-    if not raw_len:
+    raw_len = _recv_exact(sock, 4)
+    if raw_len is None:
         return {}
 
     length = struct.unpack(">I", raw_len)[0]
-    payload = b""
-    while len(payload) < length:
-        chunk = sock.recv(length - len(payload))
-        if not chunk:
-            raise ConnectionError("Connection closed before message complete")
-        payload += chunk
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        raise ConnectionError("Connection closed before message complete")
 
-    return json.loads(payload.decode("utf-8"))
+    return json.loads(payload)
 
 
 def socket_request(address: tuple[str, int], data: dict, timeout: int = 300) -> dict:
@@ -193,24 +208,74 @@ def socket_request(address: tuple[str, int], data: dict, timeout: int = 300) ->
         return socket_recv(sock)
 
 
+class LMConnectionPool:
+    """Pool of persistent connections to an LM Handler.
+
+    Reuses open sockets across requests instead of paying a TCP connect per call. Each
+    request checks out its own socket, so concurrent callers never share one.
+    """
+
+    def __init__(self, address: tuple[str, int], timeout: int = 300):
+        self.address = address
+        self.timeout = timeout
+        self._idle: list[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def request(self, data: dict) -> dict:
+        """Send a request over a pooled connection and receive the response."""
+        with self._lock:
+            sock = self._idle.pop() if self._idle else None
+        if sock is None:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+
+        try:
+            socket_send(sock, data)
+            response = socket_recv(sock)
+            if not response:
+                raise ConnectionError("Connection closed by LM Handler")
+        except Exception:
+            sock.close()
+            raise
+
+        with self._lock:
+            self._idle.append(sock)
+        return response
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            for sock in self._idle:
+                sock.close()
+            self._idle.clear()
+
+
 # =============================================================================
 # Typed Request Helpers
 # =============================================================================
 
 
-def send_lm_request(address: tuple[str, int], request: LMRequest, timeout: int = 300) -> LMResponse:
+def send_lm_request(
+    address: tuple[str, int],
+    request: LMRequest,
+    timeout: int = 300,
+    pool: LMConnectionPool | None = None,
+) -> LMResponse:
     """Send an LM request and return typed response.
 
     Args:
         address: (host, port) tuple of LM Handler server.
         request: LMRequest to send.
         timeout: Socket timeout in seconds.
+        pool: Optional connection pool to send over instead of a new connection.
 
     Returns:
         LMResponse with content or error.
     """
     try:
-        response_data = socket_request(address, request.to_dict(), timeout)
+        if pool is not None:
+            response_data = pool.request(request.to_dict())
+        else:
+            response_data = socket_request(address, request.to_dict(), timeout)
         return LMResponse.from_dict(response_data)
     except Exception as e:
         return LMResponse.error_response(f"Request failed: {e}")
@@ -221,6 +286,7 @@ def send_lm_request_batched(
     prompts: list[str | dict[str, Any]],
     model: str | None = None,
     timeout: int = 300,
+    pool: LMConnectionPool | None = None,
 ) -> list[LMResponse]:
     """Send a batched LM request and return a list of typed responses.
 
@@ -229,13 +295,17 @@ def send_lm_request_batched(
         prompts: List of prompts to send.
         model: Optional model name to use.
         timeout: Socket timeout in seconds.
+        pool: Optional connection pool to send over instead of a new connection.
 
     Returns:
         List of LMResponse objects, one per prompt, in the same order.
     """
     try:
         request = LMRequest(prompts=prompts, model=model)
-        response_data = socket_request(address, request.to_dict(), timeout)
+        if pool is not None:
+            response_data = pool.request(request.to_dict())
+        else:
+            response_data = socket_request(address, request.to_dict(), timeout)
         response = LMResponse.from_dict(response_data)
 
         if not response.success:
@@ -0,0 +1,45 @@
+"""
+LLMCache - Content-addressed on-disk cache for LM completions.
+
+Keyed on sha256(model + messages). Each entry is a small JSON file under `cache_dir`, so
+repeated runs of the same prompts (e.g. demo scripts during development) skip the API call.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any
+
+
+class LLMCache:
+    """On-disk cache mapping (model, prompt) to the LM response string."""
+
+    def __init__(self, cache_dir: str):
+        # Absolute, since code executing in an environment may change the working directory
+        self.cache_dir = os.path.abspath(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(model: str | None, prompt: str | dict[str, Any] | list[dict[str, Any]]) -> str:
+        """Compute the cache key for a prompt sent to a model."""
+        payload = json.dumps({"model": model, "messages": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response, or None on a miss."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, response: str) -> None:
+        """Store a response. Written atomically so concurrent readers never see partial files."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"response": response}))
+        os.replace(tmp_path, self._path(key))
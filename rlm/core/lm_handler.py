@@ -6,20 +6,35 @@ Uses a multi-threaded socket server. Protocol: 4-byte length prefix + JSON paylo
 
 import asyncio
 import time
+from collections.abc import Iterator
 from socketserver import StreamRequestHandler, ThreadingTCPServer
 from threading import Thread
 
 from rlm.clients.base_lm import BaseLM
 from rlm.core.comms_utils import LMRequest, LMResponse, socket_recv, socket_send
+from rlm.core.llm_cache import LLMCache
 from rlm.core.types import RLMChatCompletion, UsageSummary
 
+# Max concurrent provider requests across all llm_query_batched() calls served by one handler
+DEFAULT_MAX_CONCURRENCY = 16
+
 
 class LMRequestHandler(StreamRequestHandler):
     """Socket handler for LLM completion requests."""
 
     def handle(self):
+        # Serve requests until the client closes the connection (persistent connections)
+        while True:
+            try:
+                request_data = socket_recv(self.connection)
+            except (ConnectionError, OSError):
+                return
+            if request_data == {}:
+                return
+            self._respond(request_data)
+
+    def _respond(self, request_data: dict) -> None:
         try:
-            request_data = socket_recv(self.connection)
             if not isinstance(request_data, dict):
                 response = LMResponse.error_response("Request must be a JSON object")
                 socket_send(self.connection, response.to_dict())
@@ -68,11 +83,17 @@ class LMRequestHandler(StreamRequestHandler):
 
         start_time = time.perf_counter()
 
+        # Bound in-flight requests so large batches don't trip provider rate limits (429s).
+        # The semaphore is shared by all batches, which may arrive concurrently from code
+        # blocks running in parallel.
+        async def run_one(prompt):
+            async with handler.semaphore:
+                return await client.acompletion(prompt)
+
         async def run_all():
-            tasks = [client.acompletion(prompt) for prompt in request.prompts]
-            return await asyncio.gather(*tasks)
+            return await asyncio.gather(*[run_one(prompt) for prompt in request.prompts])
 
-        results = asyncio.run(run_all())
+        results = handler.run_coroutine(run_all())
         end_time = time.perf_counter()
 
         total_time = end_time - start_time
@@ -105,6 +126,9 @@ class LMHandler:
 
     Uses a multi-threaded socket server for concurrent requests.
     Protocol: 4-byte big-endian length prefix + JSON payload.
+
+    Batched requests fan out on a single persistent event loop (running in its own thread),
+    so async SDK clients keep their connection pools across batches.
     """
 
     def __init__(
@@ -112,13 +136,20 @@ class LMHandler:
         client: BaseLM,
         host: str = "127.0.0.1",
         port: int = 0,  # auto-assign available port
+        cache: LLMCache | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
     ):
         self.default_client = client
+        self.cache = cache
         self.clients: dict[str, BaseLM] = {}
         self.host = host
         self._server: ThreadingLMServer | None = None
         self._thread: Thread | None = None
         self._port = port
+        self.max_concurrency = max_concurrency
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: Thread | None = None
+        self.semaphore: asyncio.Semaphore | None = None
 
         self.register_client(client.model_name, client)
 
@@ -149,6 +180,12 @@ class LMHandler:
         if self._server is not None:
             return self.address
 
+        self._loop = asyncio.new_event_loop()
+        # Created with the loop it is awaited on, so a restarted handler gets a fresh one
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop_thread = Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+
         self._server = ThreadingLMServer((self.host, self._port), LMRequestHandler)
         self._server.lm_handler = self  # type: ignore
 
@@ -161,12 +198,73 @@ class LMHandler:
         """Stop the socket server."""
         if self._server:
             self._server.shutdown()
+            self._server.server_close()
             self._server = None
             self._thread = None
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+            self._loop = None
+            self._loop_thread = None
+
+    def run_coroutine(self, coro):
+        """Run a coroutine on the handler's event loop and block until it completes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def arun_coroutine(self, coro):
+        """Run a coroutine on the handler's event loop and await it from the caller's loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
 
     def completion(self, prompt: str, model: str | None = None) -> str:
-        """Direct completion call (for main process use)."""
-        return self.get_client(model).completion(prompt)
+        """Direct completion call (for main process use). Served from the cache if set."""
+        client = self.get_client(model)
+        if self.cache is None:
+            return client.completion(prompt)
+
+        key = self.cache.key(client.model_name, prompt)
+        response = self.cache.get(key)
+        if response is None:
+            response = client.completion(prompt)
+            self.cache.set(key, response)
+        return response
+
+    def stream_completion(self, prompt: str, model: str | None = None) -> Iterator[str]:
+        """Streaming completion call (for main process use). Served from the cache if set."""
+        client = self.get_client(model)
+        if self.cache is None:
+            yield from client.stream_completion(prompt)
+            return
+
+        key = self.cache.key(client.model_name, prompt)
+        response = self.cache.get(key)
+        if response is not None:
+            yield response
+            return
+
+        chunks = []
+        for chunk in client.stream_completion(prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.set(key, "".join(chunks))
+
+    async def acompletion(self, prompt: str, model: str | None = None) -> str:
+        """
+        Direct async completion call (for main process use). Served from the cache if set.
+
+        The client call runs on the handler's event loop, like batched sub-calls do: async SDK
+        clients are bound to the loop they first run on, so sharing one across loops fails.
+        """
+        client = self.get_client(model)
+        if self.cache is None:
+            return await self.arun_coroutine(client.acompletion(prompt))
+
+        key = self.cache.key(client.model_name, prompt)
+        response = self.cache.get(key)
+        if response is None:
+            response = await self.arun_coroutine(client.acompletion(prompt))
+            self.cache.set(key, response)
+        return response
 
     def __enter__(self):
         self.start()
@@ -1,24 +1,32 @@
+import asyncio
 import time
-from contextlib import contextmanager
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import replace
+from typing import Any, cast
 
 from rlm.clients import BaseLM, get_client
+from rlm.core.llm_cache import LLMCache
 from rlm.core.lm_handler import LMHandler
 from rlm.core.types import (
     ClientBackend,
     CodeBlock,
+    CodeFootprint,
     EnvironmentType,
+    ModelUsageSummary,
     REPLResult,
     RLMChatCompletion,
     RLMIteration,
     RLMMetadata,
+    UsageSummary,
 )
-from rlm.environments import BaseEnv, get_environment
+from rlm.environments import BaseEnv, LocalREPL, get_environment
 from rlm.logger import RLMLogger, VerbosePrinter
 from rlm.utils.parsing import (
-    find_code_blocks,
+    StreamingCodeBlockParser,
     find_final_answer,
     format_iteration,
+    iter_code_blocks,
 )
 from rlm.utils.prompts import (
     RLM_SYSTEM_PROMPT,
@@ -28,13 +36,75 @@ from rlm.utils.prompts import (
 )
 from rlm.utils.rlm_utils import filter_sensitive_keys
 
+# Most code blocks of one response executing at the same time
+_MAX_CONCURRENT_BLOCKS = 8
+
+
+def _schedule_block(
+    footprint: CodeFootprint | None, earlier: list[CodeFootprint | None]
+) -> tuple[CodeFootprint | None, list[int]]:
+    """
+    根据代码块的足迹，返回它的完整足迹以及必须先执行完的先前代码块的下标。
+    足迹未知（None）的代码块与所有代码块按顺序执行。
+    """
+    if footprint is None or None in earlier:
+        return None, list(range(len(earlier)))
+
+    # A block using names bound by an earlier block may call into its code (e.g. a function
+    # it defined), so it takes on that block's footprint. Stored footprints are already merged.
+    for previous in earlier:
+        if not previous.writes.isdisjoint(footprint.reads):
+            footprint = footprint.merge(previous)
+    # Names rebound in this turn may no longer hold the immutable value seen above
+    rebound = frozenset().union(*(previous.writes for previous in earlier))
+    footprint = replace(footprint, shared=footprint.shared - rebound)
+
+    return footprint, [
+        i for i, previous in enumerate(earlier) if footprint.conflicts_with(previous)
+    ]
+
+
+def _execute_after(
+    dependencies: list[Future[REPLResult]], environment: BaseEnv, code: str
+) -> REPLResult:
+    """等待依赖的代码块执行完毕后执行代码。"""
+    wait(dependencies)
+    return environment.execute_code(code)
+
+
+def _usage_since(start: UsageSummary, end: UsageSummary) -> UsageSummary:
+    """返回两个累积使用摘要之间的差值（会话中的客户端会跨调用累积使用量）。"""
+    summaries = {}
+    for model, usage in end.model_usage_summaries.items():
+        before = start.model_usage_summaries.get(model)
+        if before is None:
+            summaries[model] = usage
+        elif usage.total_calls != before.total_calls:
+            summaries[model] = ModelUsageSummary(
+                total_calls=usage.total_calls - before.total_calls,
+                total_input_tokens=usage.total_input_tokens - before.total_input_tokens,
+                total_output_tokens=usage.total_output_tokens - before.total_output_tokens,
+            )
+    return UsageSummary(model_usage_summaries=summaries)
+
+
+def _default_answer_prompt(message_history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """构建用尽迭代次数后请求最终答案的提示。"""
+    return message_history + [
+        {
+            "role": "assistant",
+            "content": "Please provide a final answer to the user's question based on the information provided.",
+        }
+    ]
+
 
 class RLM:
     """
     递归语言模型类，用户实例化并在其任务上运行。
 
     每个 completion() 调用都会生成自己的环境和语言模型处理器，
-    当调用完成时会被清理。
+    当调用完成时会被清理。作为上下文管理器使用时（`with RLM(...) as rlm:`），
+    处理器和本地环境在会话内的所有 completion() 调用之间复用。
     """
 
     def __init__(
@@ -51,6 +121,7 @@ class RLM:
         other_backend_kwargs: list[dict[str, Any]] | None = None,
         logger: RLMLogger | None = None,
         verbose: bool = False,
+        cache_dir: str | None = None,
     ):
         """
         参数:
@@ -66,6 +137,9 @@ class RLM:
             other_backend_kwargs: 传递给其他客户端后端的关键字参数（顺序与 other_backends 匹配）。
             logger: 用于 RLM 的日志记录器。
             verbose: 是否在控制台以富文本形式打印详细输出。
+            cache_dir: 如果设置，根语言模型的响应按 (模型, 消息) 缓存在此目录中，
+                重复运行相同的提示时直接命中缓存（例如 "./logs/llm_cache"）。
+                仅适用于确定性设置（如 temperature=0）。
         """
         # Store config for spawning per-completion
         self.backend = backend
@@ -83,17 +157,24 @@ class RLM:
         self.system_prompt = custom_system_prompt if custom_system_prompt else RLM_SYSTEM_PROMPT
         self.logger = logger
         self.verbose = VerbosePrinter(enabled=verbose)
+        self.llm_cache = LLMCache(cache_dir) if cache_dir else None
+
+        # Fixed for the RLM's lifetime; computed once instead of on every completion
+        self._root_model = (backend_kwargs or {}).get("model_name", "unknown")
+        self._safe_backend_kwargs = filter_sensitive_keys(backend_kwargs or {})
+
+        # Handler/environment reused across completion() calls inside `with RLM(...)`
+        self._session_handler: LMHandler | None = None
+        self._session_environment: LocalREPL | None = None
 
         # Log metadata if logger is provided
         if self.logger or verbose:
             metadata = RLMMetadata(
-                root_model=backend_kwargs.get("model_name", "unknown")
-                if backend_kwargs
-                else "unknown",
+                root_model=self._root_model,
                 max_depth=max_depth,
                 max_iterations=max_iterations,
                 backend=backend,
-                backend_kwargs=filter_sensitive_keys(backend_kwargs) if backend_kwargs else {},
+                backend_kwargs=self._safe_backend_kwargs,
                 environment_type=environment,
                 environment_kwargs=filter_sensitive_keys(environment_kwargs)
                 if environment_kwargs
@@ -104,15 +185,11 @@ class RLM:
                 self.logger.log_metadata(metadata)
             self.verbose.print_metadata(metadata)
 
-    @contextmanager
-    def _spawn_completion_context(self, prompt: str | dict[str, Any]):
-        """
-        为单个完成调用生成语言模型处理器和环境。
-        当上下文退出时清理两者。
-        """
+    def _create_lm_handler(self) -> LMHandler:
+        """创建客户端，包装在语言模型处理器中并启动其套接字服务器。"""
         # Create client and wrap in handler
         client: BaseLM = get_client(self.backend, self.backend_kwargs)
-        lm_handler = LMHandler(client)
+        lm_handler = LMHandler(client, cache=self.llm_cache)
 
         # Register other clients to be available as sub-call options
         if self.other_backends and self.other_backend_kwargs:
@@ -121,20 +198,109 @@ class RLM:
                 lm_handler.register_client(other_client.model_name, other_client)
 
         lm_handler.start()
+        return lm_handler
 
+    def _create_environment(
+        self, lm_handler: LMHandler, prompt: str | dict[str, Any] | None
+    ) -> BaseEnv:
+        """创建连接到给定语言模型处理器的环境。"""
         # Pass handler address to environment so it can make llm_query() calls
         env_kwargs = self.environment_kwargs.copy()
         env_kwargs["lm_handler_address"] = (lm_handler.host, lm_handler.port)
         env_kwargs["context_payload"] = prompt
 
-        # Initialize the environment
-        environment: BaseEnv = get_environment(self.environment_type, env_kwargs)
+        return get_environment(self.environment_type, env_kwargs)
+
+    @contextmanager
+    def _spawn_completion_context(self, prompt: str | dict[str, Any]):
+        """
+        为单个完成调用生成语言模型处理器和环境。
+        当上下文退出时清理两者。
+        """
+        lm_handler, environment = self._spawn(prompt)
+        try:
+            yield lm_handler, environment
+        finally:
+            self._teardown(lm_handler, environment)
+
+    @asynccontextmanager
+    async def _aspawn_completion_context(self, prompt: str | dict[str, Any]):
+        """
+        _spawn_completion_context() 的异步版本。创建和清理（停止套接字服务器最多需要
+        0.5 秒）在线程中进行，不阻塞事件循环。
+        """
+        lm_handler, environment = await asyncio.to_thread(self._spawn, prompt)
+        try:
+            yield lm_handler, environment
+        finally:
+            await asyncio.to_thread(self._teardown, lm_handler, environment)
+
+    def _spawn(self, prompt: str | dict[str, Any]) -> tuple[LMHandler, BaseEnv]:
+        """创建并启动语言模型处理器，以及连接到它的环境。"""
+        lm_handler = self._create_lm_handler()
+        return lm_handler, self._create_environment(lm_handler, prompt)
+
+    def _teardown(self, lm_handler: LMHandler, environment: BaseEnv) -> None:
+        """停止语言模型处理器并清理环境。"""
+        lm_handler.stop()
+        if hasattr(environment, "cleanup"):
+            environment.cleanup()
+
+    def _ensure_session(self) -> LMHandler:
+        """
+        惰性创建跨 completion() 调用复用的语言模型处理器（以及本地环境）。
+        在 close() 之前一直缓存在实例上。
+        """
+        if self._session_handler is None:
+            self._session_handler = self._create_lm_handler()
+            # Only LocalREPL.reset() resets its namespace in place; other environments
+            # (containers, sandboxes) are still created per completion.
+            if self.environment_type == "local":
+                self._session_environment = cast(
+                    LocalREPL, self._create_environment(self._session_handler, None)
+                )
+        return self._session_handler
+
+    def close(self) -> None:
+        """停止会话的语言模型处理器并清理会话环境。"""
+        if self._session_handler is not None:
+            self._session_handler.stop()
+            self._session_handler = None
+        if self._session_environment is not None:
+            if hasattr(self._session_environment, "cleanup"):
+                self._session_environment.cleanup()
+            self._session_environment = None
+
+    def __enter__(self) -> "RLM":
+        self._ensure_session()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
 
+    @contextmanager
+    def _completion_context(self, prompt: str | dict[str, Any]):
+        """
+        在会话中复用缓存的语言模型处理器和环境；否则为此调用生成新的。
+        """
+        if self._session_handler is None:
+            with self._spawn_completion_context(prompt) as (lm_handler, environment):
+                yield lm_handler, environment
+            return
+
+        lm_handler = self._session_handler
+        environment = self._session_environment
+        if environment is not None:
+            # Reset the namespace (replaying setup_code) instead of recreating the environment
+            environment.reset(prompt)
+            yield lm_handler, environment
+            return
+
+        environment = self._create_environment(lm_handler, prompt)
         try:
             yield lm_handler, environment
         finally:
-            # Cleanup
-            lm_handler.stop()
             if hasattr(environment, "cleanup"):
                 environment.cleanup()
 
@@ -157,7 +323,8 @@ class RLM:
         递归语言模型完成调用。这是查询 RLM 的主要入口点，
         可以替代常规的语言模型完成调用。
 
-        为此调用的持续时间生成自己的环境和语言模型处理器。
+        为此调用的持续时间生成自己的环境和语言模型处理器；在 `with RLM(...)` 会话中
+        则复用会话的处理器和环境。
 
         参数:
             prompt: 作为上下文传递给模型的单个字符串或消息字典。
@@ -172,67 +339,123 @@ class RLM:
         if self.depth >= self.max_depth:
             return self._fallback_answer(prompt)
 
-        with self._spawn_completion_context(prompt) as (lm_handler, environment):
+        with self._completion_context(prompt) as (lm_handler, environment):
+            usage_start = lm_handler.get_usage_summary()
             message_history = self._setup_prompt(prompt)
 
             for i in range(self.max_iterations):
-                # Current prompt = message history + additional prompt suffix
-                current_prompt = message_history + [build_user_prompt(root_prompt, i)]
-
                 iteration: RLMIteration = self._completion_turn(
-                    prompt=current_prompt,
+                    prompt=self._iteration_prompt(message_history, root_prompt, i),
                     lm_handler=lm_handler,
                     environment=environment,
                 )
+                final_answer = self._record_iteration(iteration, i + 1, environment)
+                if final_answer is not None:
+                    return self._finish_completion(
+                        prompt, final_answer, i + 1, time_start, usage_start, lm_handler
+                    )
+                message_history.extend(format_iteration(iteration))
 
-                # Check if RLM is done and has a final answer.
-                final_answer = find_final_answer(iteration.response, environment=environment)
-                iteration.final_answer = final_answer
+            # Default behavior: we run out of iterations, provide one final answer
+            final_answer = self._default_answer(message_history, lm_handler)
+            return self._finish_completion(
+                prompt, final_answer, self.max_iterations, time_start, usage_start, lm_handler
+            )
 
-                # If logger is used, log the iteration.
-                if self.logger:
-                    self.logger.log(iteration)
+    async def acompletion(
+        self, prompt: str | dict[str, Any], root_prompt: str | None = None
+    ) -> RLMChatCompletion:
+        """
+        completion() 的异步版本。根语言模型调用通过客户端的 acompletion() 等待，
+        代码执行、环境的创建和清理在线程中进行，因此多个 acompletion() 调用
+        可以通过 asyncio.gather 并发运行。
 
-                # Verbose output for this iteration
-                self.verbose.print_iteration(iteration, i + 1)
+        每个调用生成自己的环境和语言模型处理器，因此并发调用之间不共享状态。
 
-                if final_answer is not None:
-                    time_end = time.perf_counter()
-                    usage = lm_handler.get_usage_summary()
-                    self.verbose.print_final_answer(final_answer)
-                    self.verbose.print_summary(i + 1, time_end - time_start, usage.to_dict())
-                    return RLMChatCompletion(
-                        root_model=self.backend_kwargs.get("model_name", "unknown")
-                        if self.backend_kwargs
-                        else "unknown",
-                        prompt=prompt,
-                        response=final_answer,
-                        usage_summary=usage,
-                        execution_time=time_end - time_start,
-                    )
+        参数:
+            prompt: 作为上下文传递给模型的单个字符串或消息字典。
+            root_prompt: 根语言模型可以看到的（小）用户提示。
+        返回:
+            作为字符串的最终答案。
+        """
+        time_start = time.perf_counter()
 
-                # Format the iteration for the next prompt.
-                new_messages = format_iteration(iteration)
+        # If we're at max depth, the RLM is an LM, so we fallback to the regular LM.
+        if self.depth >= self.max_depth:
+            return await self._afallback_answer(prompt)
 
-                # Update message history with the new messages.
-                message_history.extend(new_messages)
+        async with self._aspawn_completion_context(prompt) as (lm_handler, environment):
+            usage_start = lm_handler.get_usage_summary()
+            message_history = self._setup_prompt(prompt)
+
+            for i in range(self.max_iterations):
+                iteration: RLMIteration = await self._acompletion_turn(
+                    prompt=self._iteration_prompt(message_history, root_prompt, i),
+                    lm_handler=lm_handler,
+                    environment=environment,
+                )
+                # Runs FINAL_VAR(...) in the environment, so it also stays off the event loop
+                final_answer = await asyncio.to_thread(
+                    self._record_iteration, iteration, i + 1, environment
+                )
+                if final_answer is not None:
+                    return self._finish_completion(
+                        prompt, final_answer, i + 1, time_start, usage_start, lm_handler
+                    )
+                message_history.extend(format_iteration(iteration))
 
             # Default behavior: we run out of iterations, provide one final answer
-            time_end = time.perf_counter()
-            final_answer = self._default_answer(message_history, lm_handler)
-            usage = lm_handler.get_usage_summary()
-            self.verbose.print_final_answer(final_answer)
-            self.verbose.print_summary(self.max_iterations, time_end - time_start, usage.to_dict())
-            return RLMChatCompletion(
-                root_model=self.backend_kwargs.get("model_name", "unknown")
-                if self.backend_kwargs
-                else "unknown",
-                prompt=prompt,
-                response=final_answer,
-                usage_summary=usage,
-                execution_time=time_end - time_start,
+            final_answer = await self._adefault_answer(message_history, lm_handler)
+            return self._finish_completion(
+                prompt, final_answer, self.max_iterations, time_start, usage_start, lm_handler
             )
 
+    def _iteration_prompt(
+        self, message_history: list[dict[str, Any]], root_prompt: str | None, iteration: int
+    ) -> list[dict[str, Any]]:
+        """
+        当前提示 = 消息历史记录 + 附加的提示后缀。后缀只追加在末尾，
+        以保持缓存的提示前缀稳定。
+        """
+        return message_history + [build_user_prompt(root_prompt, iteration)]
+
+    def _record_iteration(
+        self, iteration: RLMIteration, iteration_num: int, environment: BaseEnv
+    ) -> str | None:
+        """检查迭代是否给出了最终答案，并记录和打印该迭代。返回最终答案（如果有）。"""
+        final_answer = find_final_answer(iteration.response, environment=environment)
+        iteration.final_answer = final_answer
+
+        if self.logger:
+            self.logger.log(iteration)
+        self.verbose.print_iteration(iteration, iteration_num)
+
+        return final_answer
+
+    def _finish_completion(
+        self,
+        prompt: str | dict[str, Any],
+        final_answer: str,
+        num_iterations: int,
+        time_start: float,
+        usage_start: UsageSummary,
+        lm_handler: LMHandler,
+    ) -> RLMChatCompletion:
+        """打印摘要，将日志写入磁盘，并构建完成调用的结果。"""
+        time_end = time.perf_counter()
+        usage = _usage_since(usage_start, lm_handler.get_usage_summary())
+        self.verbose.print_final_answer(final_answer)
+        self.verbose.print_summary(num_iterations, time_end - time_start, usage.to_dict())
+        if self.logger:
+            self.logger.flush()
+        return RLMChatCompletion(
+            root_model=self._root_model,
+            prompt=prompt,
+            response=final_answer,
+            usage_summary=usage,
+            execution_time=time_end - time_start,
+        )
+
     def _completion_turn(
         self,
         prompt: str | dict[str, Any],
@@ -241,15 +464,68 @@ class RLM:
     ) -> RLMIteration:
         """
         执行 RLM 的单个迭代，包括提示模型
-        和代码执行 + 工具执行。
+        和代码执行 + 工具执行。响应以流式方式接收，代码执行与生成重叠。
+        """
+        iter_start = time.perf_counter()
+        parser = StreamingCodeBlockParser()
+        code_block_strs: list[str] = []
+        footprints: list[CodeFootprint | None] = []
+        futures: list[Future[REPLResult]] = []
+
+        # Execute each code block as soon as its closing fence streams in, while the model
+        # keeps generating. A block waits only for the earlier blocks it depends on, so
+        # independent blocks (e.g. separate llm_query calls) run concurrently. Workers pick
+        # up blocks in order, so a waiting block's dependencies are always already running.
+        with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_BLOCKS) as executor:
+            for code_block_str in parser.parse(lm_handler.stream_completion(prompt)):
+                footprint, dependencies = _schedule_block(
+                    environment.code_footprint(code_block_str), footprints
+                )
+                code_block_strs.append(code_block_str)
+                footprints.append(footprint)
+                futures.append(
+                    executor.submit(
+                        _execute_after,
+                        [futures[i] for i in dependencies],
+                        environment,
+                        code_block_str,
+                    )
+                )
+
+            response = parser.text
+            code_results = [future.result() for future in futures]
+
+        code_blocks = [
+            CodeBlock(code=code_block_str, result=code_result)
+            for code_block_str, code_result in zip(code_block_strs, code_results, strict=True)
+        ]
+
+        iteration_time = time.perf_counter() - iter_start
+        return RLMIteration(
+            prompt=prompt,
+            response=response,
+            code_blocks=code_blocks,
+            iteration_time=iteration_time,
+        )
+
+    async def _acompletion_turn(
+        self,
+        prompt: str | dict[str, Any],
+        lm_handler: LMHandler,
+        environment: BaseEnv,
+    ) -> RLMIteration:
+        """
+        _completion_turn() 的异步版本。代码块在线程中按顺序执行，因此执行期间
+        （包括 llm_query 的套接字往返）其他 acompletion() 调用可以继续运行。
         """
         iter_start = time.perf_counter()
-        response = lm_handler.completion(prompt)
-        code_block_strs = find_code_blocks(response)
+        response = await lm_handler.acompletion(prompt)
         code_blocks = []
 
-        for code_block_str in code_block_strs:
-            code_result: REPLResult = environment.execute_code(code_block_str)
+        for code_block_str in iter_code_blocks(response):
+            code_result: REPLResult = await asyncio.to_thread(
+                environment.execute_code, code_block_str
+            )
             code_blocks.append(CodeBlock(code=code_block_str, result=code_result))
 
         iteration_time = time.perf_counter() - iter_start
@@ -265,30 +541,45 @@ class RLM:
         如果 RLM 用尽迭代次数且未找到最终答案的默认行为。
         它会使用消息历史记录，并尝试从中生成最终答案。
         """
-        current_prompt = message_history + [
-            {
-                "role": "assistant",
-                "content": "Please provide a final answer to the user's question based on the information provided.",
-            }
-        ]
+        current_prompt = _default_answer_prompt(message_history)
         response = lm_handler.completion(current_prompt)
+        self._log_default_answer(current_prompt, response)
+        return response
 
+    async def _adefault_answer(
+        self, message_history: list[dict[str, Any]], lm_handler: LMHandler
+    ) -> str:
+        """_default_answer() 的异步版本。"""
+        current_prompt = _default_answer_prompt(message_history)
+        response = await lm_handler.acompletion(current_prompt)
+        self._log_default_answer(current_prompt, response)
+        return response
+
+    def _log_default_answer(self, prompt: list[dict[str, Any]], response: str) -> None:
+        """将默认答案作为最后一次迭代记录。"""
         if self.logger:
             self.logger.log(
                 RLMIteration(
-                    prompt=current_prompt,
+                    prompt=prompt,
                     response=response,
                     final_answer=response,
                     code_blocks=[],
                 )
             )
 
-        return response
+    def _fallback_handler(self) -> LMHandler:
+        """创建用于回退行为的语言模型处理器。"""
+        client: BaseLM = get_client(self.backend, self.backend_kwargs)
+        return LMHandler(client, cache=self.llm_cache)
 
     def _fallback_answer(self, message: str | dict[str, Any]) -> str:
         """
         如果 RLM 实际上已达到最大深度，应被视为普通语言模型的回退行为。
         """
-        client: BaseLM = get_client(self.backend, self.backend_kwargs)
-        response = client.completion(message)
-        return response
+        return self._fallback_handler().completion(message)
+
+    async def _afallback_answer(self, message: str | dict[str, Any]) -> str:
+        """_fallback_answer() 的异步版本。"""
+        # Started for its event loop, which acompletion() runs the client call on
+        with self._fallback_handler() as lm_handler:
+            return await lm_handler.acompletion(message)
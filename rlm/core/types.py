@@ -161,6 +161,37 @@ class CodeBlock:
         return {"code": self.code, "result": self.result.to_dict()}
 
 
+@dataclass(frozen=True)
+class CodeFootprint:
+    """Names a code block reads and binds, used to run independent blocks concurrently."""
+
+    reads: frozenset[str]
+    writes: frozenset[str]
+    # Reads bound to immutable values, which blocks can share without ordering
+    shared: frozenset[str] = frozenset()
+    # Block may touch state outside its names (imports, files, opaque callables)
+    exclusive: bool = False
+
+    def conflicts_with(self, other: "CodeFootprint") -> bool:
+        """Whether the two blocks must run in order."""
+        if self.exclusive or other.exclusive:
+            return True
+        if not self.writes.isdisjoint(other.reads | other.writes):
+            return True
+        if not other.writes.isdisjoint(self.reads):
+            return True
+        return not (self.reads & other.reads) <= (self.shared & other.shared)
+
+    def merge(self, other: "CodeFootprint") -> "CodeFootprint":
+        """Footprint of running both blocks, e.g. calling a function the other one defined."""
+        return CodeFootprint(
+            reads=self.reads | other.reads,
+            writes=self.writes | other.writes,
+            shared=self.shared | other.shared,
+            exclusive=self.exclusive or other.exclusive,
+        )
+
+
 @dataclass
 class RLMIteration:
     prompt: str | dict[str, Any]
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 
-from rlm.core.types import REPLResult
+from rlm.core.types import CodeFootprint, REPLResult
 
 
 class BaseEnv(ABC):
@@ -24,6 +24,13 @@ class BaseEnv(ABC):
     def execute_code(self, code: str) -> REPLResult:
         raise NotImplementedError
 
+    def code_footprint(self, code: str) -> CodeFootprint | None:
+        """
+        返回代码块读取和绑定的名称，用于并发执行互不依赖的代码块。
+        返回 None 表示未知，该代码块将与其他代码块按顺序执行。
+        """
+        return None
+
 
 class IsolatedEnv(BaseEnv, ABC):
     """
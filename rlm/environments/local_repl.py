@@ -1,3 +1,5 @@
+import ast
+import copy
 import io
 import json
 import os
@@ -7,11 +9,18 @@ import tempfile
 import threading
 import time
 import uuid
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Any
-
-from rlm.core.comms_utils import LMRequest, send_lm_request, send_lm_request_batched
-from rlm.core.types import REPLResult, RLMChatCompletion
+from types import CodeType, MethodType
+from typing import Any, NamedTuple
+
+from rlm.core.comms_utils import (
+    LMConnectionPool,
+    LMRequest,
+    send_lm_request,
+    send_lm_request_batched,
+)
+from rlm.core.types import CodeFootprint, REPLResult, RLMChatCompletion
 from rlm.environments.base_env import NonIsolatedEnv
 
 # =============================================================================
@@ -111,6 +120,190 @@ _SAFE_BUILTINS = {
 }
 
 
+# Max number of compiled code blocks kept per LocalREPL
+_CODE_CACHE_SIZE = 256
+
+# Names provided by the environment itself, hidden from the user-variable view
+_RESERVED_NAMES = frozenset(
+    {"__builtins__", "__name__", "FINAL_VAR", "llm_query", "llm_query_batched"}
+)
+
+
+# Names through which code can reach the filesystem without importing anything. Everything
+# else that can (os, pathlib, pandas, ...) has to be imported first.
+_CWD_NAMES = frozenset({"open", "__import__", "__builtins__", "vars"})
+
+
+# Builtins that reach state beyond the names a block mentions; see LocalREPL.code_footprint()
+_UNSAFE_CONCURRENT_BUILTINS = frozenset(
+    {"open", "__import__", "getattr", "setattr", "delattr", "vars", "dir"}
+)
+
+# Environment helpers that are safe to call from concurrently executing blocks
+_CONCURRENT_HELPERS = frozenset({"llm_query", "llm_query_batched"})
+
+# Types of values that are plain data, and the most items inspected per value
+_SCALAR_TYPES = frozenset({str, bytes, int, float, complex, bool, type(None)})
+_IMMUTABLE_CONTAINER_TYPES = frozenset({tuple, frozenset})
+_MUTABLE_CONTAINER_TYPES = frozenset({list, dict, set})
+_DATA_SCAN_LIMIT = 10_000
+
+_UNBOUND = object()
+
+
+# Output buffers of the REPL execution running on each thread; see _StreamProxy
+_thread_output = threading.local()
+# Buffers of all executions in progress, in start order. Threads spawned by user code have no
+# buffers of their own and write to the most recently started execution's.
+_running_buffers: list[tuple[io.StringIO, io.StringIO]] = []
+_proxy_lock = threading.Lock()
+
+
+class _StreamProxy:
+    """
+    代替 sys.stdout/sys.stderr 的代理。执行 REPL 代码期间的写入进入该次执行的缓冲区，
+    其余写入进入原来的流。这样 pprint、sys.stdout.write 等不经过 print() 的输出
+    也能被捕获，而无需在每次执行时加锁替换全局的 sys.stdout。
+    """
+
+    def __init__(self, stream, index: int):
+        self._stream = stream
+        self._index = index  # 0 for stdout, 1 for stderr
+
+    def _target(self):
+        buffers = getattr(_thread_output, "buffers", None)
+        if buffers is None:
+            # Slicing is atomic, unlike checking and then indexing a list other threads modify
+            running = _running_buffers[-1:]
+            return running[0][self._index] if running else self._stream
+        return buffers[self._index]
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._target(), name)
+
+
+class _SharedWorkingDirectory:
+    """
+    进程级工作目录的共享切换。进入同一目录的执行共用一次切换并可并发进行；
+    要进入其他目录的执行等待，直到当前目录的所有使用者都已退出。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._path: str | None = None
+        self._users = 0
+        self._saved_cwd: str | None = None
+
+    def acquire(self, path: str) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._users == 0 or self._path == path)
+            if self._users == 0:
+                self._saved_cwd = os.getcwd()
+                os.chdir(path)
+                self._path = path
+            self._users += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._users -= 1
+            if self._users == 0:
+                os.chdir(self._saved_cwd)
+                self._path = None
+                self._condition.notify_all()
+
+
+# os.chdir affects the whole process, so all LocalREPLs coordinate through one instance
+_working_directory = _SharedWorkingDirectory()
+
+
+def _install_stream_proxies() -> None:
+    """确保 sys.stdout/sys.stderr 是代理；若它们被替换为其他流（例如测试框架），则重新包装。"""
+    with _proxy_lock:
+        if not isinstance(sys.stdout, _StreamProxy):
+            sys.stdout = _StreamProxy(sys.stdout, 0)
+        if not isinstance(sys.stderr, _StreamProxy):
+            sys.stderr = _StreamProxy(sys.stderr, 1)
+
+
+class _CompiledCode(NamedTuple):
+    code: CodeType
+    has_import: bool
+    names: frozenset[str]  # Every name the code reads, binds or imports
+    reads: frozenset[str]
+    writes: frozenset[str]
+
+
+def _compile_code(code: str) -> _CompiledCode:
+    """编译代码，并记录其中的 import 语句以及读取和绑定的名称。"""
+    tree = ast.parse(code, "<repl>")
+    has_import = False
+    reads = set()
+    writes = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (reads if isinstance(node.ctx, ast.Load) else writes).add(node.id)
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            reads.add(node.target.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            writes.add(node.name)
+        elif isinstance(node, ast.Import):
+            has_import = True
+            writes.update(alias.asname or alias.name.partition(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            has_import = True
+            writes.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and node.name:
+            writes.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            writes.add(node.rest)
+    return _CompiledCode(
+        compile(tree, "<repl>", "exec"),
+        has_import,
+        frozenset(reads | writes),
+        frozenset(reads),
+        frozenset(writes),
+    )
+
+
+def _data_kind(value: Any) -> str | None:
+    """
+    判断值是否为纯数据（标量及其内置容器）。返回 "immutable" 或 "mutable"；
+    其他对象（函数、模块、自定义类实例等）或过大的值返回 None。
+    """
+    mutable = False
+    stack = [value]
+    budget = _DATA_SCAN_LIMIT
+    while stack:
+        budget -= 1
+        if budget < 0:
+            return None
+        item = stack.pop()
+        item_type = type(item)
+        if item_type in _SCALAR_TYPES:
+            continue
+        if item_type in _MUTABLE_CONTAINER_TYPES:
+            mutable = True
+        elif item_type not in _IMMUTABLE_CONTAINER_TYPES:
+            return None
+        if item_type is dict:
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        else:
+            stack.extend(item)
+    return "mutable" if mutable else "immutable"
+
+
+def _is_blank(code: str) -> bool:
+    """代码是否只包含空白和注释（即 AST 为空，执行无任何效果）。"""
+    return all(not line or line.startswith("#") for line in map(str.lstrip, code.splitlines()))
+
+
 class LocalREPL(NonIsolatedEnv):
     """
     具有持久 Python 命名空间的本地 REPL 环境。
@@ -122,14 +315,40 @@ class LocalREPL(NonIsolatedEnv):
         lm_handler_address: tuple[str, int] | None = None,
         context_payload: dict | list | str | None = None,
         setup_code: str | None = None,
+        persist_to_disk: bool = False,
         **kwargs,
     ):
         super().__init__(**kwargs)
 
         self.lm_handler_address = lm_handler_address
+        # Also write the context to context.txt/context.json in the temp dir for code that
+        # needs a file on disk; otherwise it is only injected into the namespace.
+        self.persist_to_disk = persist_to_disk
+        # Persistent sockets to the handler, reused by every llm_query() call
+        self._lm_pool = LMConnectionPool(lm_handler_address) if lm_handler_address else None
         self.original_cwd = os.getcwd()
         self.temp_dir = tempfile.mkdtemp(prefix=f"repl_env_{uuid.uuid4()}_")
-        self._lock = threading.Lock()
+        # LLM calls of the execution running on each thread, and whether it is in temp_dir
+        self._local = threading.local()
+        # Compiled code keyed by source; independent of the namespace, so it survives setup()
+        self._code_cache: OrderedDict[str, _CompiledCode] = OrderedDict()
+        self._compile_lock = threading.Lock()
+        # Kept so reset() can replay it after setup() clears the namespace
+        self.setup_code = setup_code
+
+        self.reset(context_payload)
+
+    def reset(self, context_payload: dict | list | str | None = None):
+        """
+        将环境重置为新建时的状态：清空临时目录、重建命名空间、加载上下文并重新运行
+        setup_code。会话中的每次 completion() 都以此复用同一个环境。
+        """
+        # Empty temp_dir in place, so files from the previous query aren't visible
+        for entry in os.scandir(self.temp_dir):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
 
         # Setup globals, locals, and modules in environment.
         self.setup()
@@ -139,31 +358,39 @@ class LocalREPL(NonIsolatedEnv):
             self.load_context(context_payload)
 
         # Run setup code if provided
-        if setup_code:
-            self.execute_code(setup_code)
+        if self.setup_code:
+            self.execute_code(self.setup_code)
 
     def setup(self):
         """设置环境。"""
-        # Create sandboxed globals
-        self.globals: dict[str, Any] = {
-            "__builtins__": _SAFE_BUILTINS.copy(),
+        # Single persistent namespace used as both globals and locals by exec()
+        self.namespace: dict[str, Any] = {
+            # Per-REPL copy, so code changing its builtins doesn't affect other REPLs
+            "__builtins__": {**_SAFE_BUILTINS},
             "__name__": "__main__",
+            "FINAL_VAR": self._final_var,
+            "llm_query": self._llm_query,
+            "llm_query_batched": self._llm_query_batched,
         }
-        self.locals: dict[str, Any] = {}
 
-        # Track LLM calls made during code execution
+        # LLM calls of the most recently started execution, for threads spawned by user code
         self._pending_llm_calls: list[RLMChatCompletion] = []
 
-        # Add helper functions
-        self.globals["FINAL_VAR"] = self._final_var
-        self.globals["llm_query"] = self._llm_query
-        self.globals["llm_query_batched"] = self._llm_query_batched
+    @property
+    def locals(self) -> dict[str, Any]:
+        """用户定义的变量（不包括内置项、辅助函数和以 _ 开头的名称）。"""
+        # Copied first: blocks executing concurrently may be adding names
+        return {
+            key: value
+            for key, value in self.namespace.copy().items()
+            if key not in _RESERVED_NAMES and not key.startswith("_")
+        }
 
     def _final_var(self, variable_name: str) -> str:
         """返回变量的值作为最终答案。"""
         variable_name = variable_name.strip().strip("\"'")
-        if variable_name in self.locals:
-            return str(self.locals[variable_name])
+        if variable_name in self.namespace:
+            return str(self.namespace[variable_name])
         return f"Error: Variable '{variable_name}' not found"
 
     def _llm_query(self, prompt: str, model: str | None = None) -> str:
@@ -178,13 +405,14 @@ class LocalREPL(NonIsolatedEnv):
 
         try:
             request = LMRequest(prompt=prompt, model=model)
-            response = send_lm_request(self.lm_handler_address, request)
+            with self._temp_dir_released():
+                response = send_lm_request(self.lm_handler_address, request, pool=self._lm_pool)
 
             if not response.success:
                 return f"Error: {response.error}"
 
             # Track this LLM call
-            self._pending_llm_calls.append(
+            self._llm_calls().append(
                 response.chat_completion,
             )
 
@@ -206,7 +434,10 @@ class LocalREPL(NonIsolatedEnv):
             return ["Error: No LM handler configured"] * len(prompts)
 
         try:
-            responses = send_lm_request_batched(self.lm_handler_address, prompts, model=model)
+            with self._temp_dir_released():
+                responses = send_lm_request_batched(
+                    self.lm_handler_address, prompts, model=model, pool=self._lm_pool
+                )
 
             results = []
             for response in responses:
@@ -214,7 +445,7 @@ class LocalREPL(NonIsolatedEnv):
                     results.append(f"Error: {response.error}")
                 else:
                     # Track this LLM call in list of all calls -- we may want to do this hierarchically
-                    self._pending_llm_calls.append(response.chat_completion)
+                    self._llm_calls().append(response.chat_completion)
                     results.append(response.chat_completion.response)
 
             return results
@@ -222,72 +453,170 @@ class LocalREPL(NonIsolatedEnv):
             return [f"Error: LM query failed - {e}"] * len(prompts)
 
     def load_context(self, context_payload: dict | list | str):
-        """将上下文加载到环境中。"""
+        """将上下文直接注入命名空间（无需执行代码）。"""
         if isinstance(context_payload, str):
-            context_path = os.path.join(self.temp_dir, "context.txt")
-            with open(context_path, "w") as f:
-                f.write(context_payload)
-            self.execute_code(f"with open(r'{context_path}', 'r') as f:\n    context = f.read()")
+            self.namespace["context"] = context_payload
+            if self.persist_to_disk:
+                with open(os.path.join(self.temp_dir, "context.txt"), "w") as f:
+                    f.write(context_payload)
         else:
-            context_path = os.path.join(self.temp_dir, "context.json")
-            with open(context_path, "w") as f:
-                json.dump(context_payload, f)
-            self.execute_code(
-                f"import json\nwith open(r'{context_path}', 'r') as f:\n    context = json.load(f)"
-            )
+            # Copy so code in the REPL cannot mutate the caller's payload
+            self.namespace["context"] = copy.deepcopy(context_payload)
+            if self.persist_to_disk:
+                # json.dumps encodes in one C call; json.dump writes many small pieces
+                with open(os.path.join(self.temp_dir, "context.json"), "w") as f:
+                    f.write(json.dumps(context_payload))
+
+    def _llm_calls(self) -> list[RLMChatCompletion]:
+        """当前线程正在执行的代码的 LLM 调用列表。"""
+        llm_calls = getattr(self._local, "llm_calls", None)
+        return self._pending_llm_calls if llm_calls is None else llm_calls
 
     @contextmanager
     def _capture_output(self):
-        """线程安全的上下文管理器，用于捕获标准输出/错误。"""
-        with self._lock:
-            old_stdout, old_stderr = sys.stdout, sys.stderr
-            stdout_buf, stderr_buf = io.StringIO(), io.StringIO()
-            try:
-                sys.stdout, sys.stderr = stdout_buf, stderr_buf
-                yield stdout_buf, stderr_buf
-            finally:
-                sys.stdout, sys.stderr = old_stdout, old_stderr
+        """
+        捕获当前线程的标准输出、标准错误和 LLM 调用的上下文管理器。
+        不替换全局流、不加锁，可从多个线程重入。
+        """
+        _install_stream_proxies()
+        buffers = (io.StringIO(), io.StringIO())
+        llm_calls: list[RLMChatCompletion] = []
+        previous = (
+            getattr(_thread_output, "buffers", None),
+            getattr(self._local, "llm_calls", None),
+        )
+        _thread_output.buffers = buffers
+        # Threads spawned by user code fall back to the most recently started execution
+        self._local.llm_calls = self._pending_llm_calls = llm_calls
+        _running_buffers.append(buffers)
+        try:
+            yield buffers[0], buffers[1], llm_calls
+        finally:
+            _running_buffers.remove(buffers)
+            _thread_output.buffers, self._local.llm_calls = previous
 
     @contextmanager
     def _temp_cwd(self):
-        """临时更改为执行的临时目录。"""
-        old_cwd = os.getcwd()
+        """
+        临时更改为执行的临时目录。同一 REPL 并发执行的代码块共用一次切换；
+        其他 REPL 的代码块等待切换回来（见 _SharedWorkingDirectory）。
+        """
+        _working_directory.acquire(self.temp_dir)
+        previous = getattr(self._local, "in_temp_dir", False)
+        self._local.in_temp_dir = True
         try:
-            os.chdir(self.temp_dir)
             yield
         finally:
-            os.chdir(old_cwd)
-
-    def execute_code(self, code: str) -> REPLResult:
-        """在持久命名空间中执行代码并返回结果。"""
-        start_time = time.perf_counter()
+            self._local.in_temp_dir = previous
+            _working_directory.release()
 
-        # Clear pending LLM calls from previous execution
-        self._pending_llm_calls = []
+    @contextmanager
+    def _temp_dir_released(self):
+        """
+        等待语言模型响应期间让出工作目录，使其他 REPL 的代码块可以在此期间执行。
+        此时代码块的线程阻塞在套接字上，不会访问文件系统。
+        """
+        if not getattr(self._local, "in_temp_dir", False):
+            yield
+            return
+        _working_directory.release()
+        try:
+            yield
+        finally:
+            _working_directory.acquire(self.temp_dir)
+
+    def _compile(self, code: str) -> _CompiledCode:
+        """编译代码，按源代码缓存（LRU），重复执行相同代码时跳过解析和编译。"""
+        with self._compile_lock:
+            compiled = self._code_cache.get(code)
+            if compiled is not None:
+                self._code_cache.move_to_end(code)
+                return compiled
+
+            compiled = _compile_code(code)
+            self._code_cache[code] = compiled
+            if len(self._code_cache) > _CODE_CACHE_SIZE:
+                self._code_cache.popitem(last=False)
+            return compiled
+
+    def code_footprint(self, code: str) -> CodeFootprint:
+        """
+        返回代码块读取和绑定的名称，用于并发执行互不依赖的代码块。
 
-        with self._capture_output() as (stdout_buf, stderr_buf):
-            with self._temp_cwd():
-                try:
-                    combined = {**self.globals, **self.locals}
-                    exec(code, combined, combined)
+        只读取纯数据变量、安全内置函数和 llm_query 的代码块可以与其他代码块并发执行；
+        包含 import、可能访问文件系统，或调用已有函数等无法分析的对象的代码块标记为独占。
+        """
+        if _is_blank(code):
+            return CodeFootprint(reads=frozenset(), writes=frozenset())
+        try:
+            compiled = self._compile(code)
+        except SyntaxError:
+            # Fails before running anything
+            return CodeFootprint(reads=frozenset(), writes=frozenset())
+
+        exclusive = compiled.has_import or not compiled.names.isdisjoint(_CWD_NAMES)
+        reads = set()
+        shared = set()
+        builtins = self.namespace["__builtins__"]
+        for name in compiled.reads:
+            # Recorded even for builtins and helpers, in case an earlier block rebinds them
+            reads.add(name)
+            # Earlier blocks may still be running and changing the namespace
+            value = self.namespace.get(name, _UNBOUND)
+            if value is _UNBOUND:
+                if name in builtins:
+                    shared.add(name)
+                    exclusive = exclusive or name in _UNSAFE_CONCURRENT_BUILTINS
+                # Otherwise bound by an earlier block of this turn (or undefined)
+                continue
+            if (
+                name in _CONCURRENT_HELPERS
+                and isinstance(value, MethodType)
+                and value.__self__ is self
+            ):
+                shared.add(name)
+                continue
+            kind = _data_kind(value)
+            if kind == "immutable":
+                shared.add(name)
+            elif kind is None:
+                exclusive = True
+
+        return CodeFootprint(
+            reads=frozenset(reads),
+            writes=compiled.writes,
+            shared=frozenset(shared),
+            exclusive=exclusive,
+        )
 
-                    # Update locals with new variables
-                    for key, value in combined.items():
-                        if key not in self.globals and not key.startswith("_"):
-                            self.locals[key] = value
+    def execute_code(self, code: str) -> REPLResult:
+        """在持久命名空间中执行代码并返回结果。"""
+        # Empty or comment-only blocks (common from models) have nothing to run
+        if _is_blank(code):
+            return REPLResult(stdout="", stderr="", locals=self.locals, execution_time=0.0)
 
-                    stdout = stdout_buf.getvalue()
-                    stderr = stderr_buf.getvalue()
-                except Exception as e:
-                    stdout = stdout_buf.getvalue()
-                    stderr = stderr_buf.getvalue() + f"\n{type(e).__name__}: {e}"
+        start_time = time.perf_counter()
 
+        with self._capture_output() as (stdout_buf, stderr_buf, llm_calls):
+            try:
+                compiled = self._compile(code)
+                with self._temp_cwd():
+                    exec(compiled.code, self.namespace, self.namespace)
+                stdout = stdout_buf.getvalue()
+                stderr = stderr_buf.getvalue()
+            except Exception as e:
+                stdout = stdout_buf.getvalue()
+                stderr = stderr_buf.getvalue() + f"\n{type(e).__name__}: {e}"
+
+        # self.locals builds one shallow snapshot of the user variables. A live view would let
+        # later code blocks change what earlier results (and their logs) report.
         return REPLResult(
             stdout=stdout,
             stderr=stderr,
-            locals=self.locals.copy(),
+            locals=self.locals,
             execution_time=time.perf_counter() - start_time,
-            rlm_calls=self._pending_llm_calls.copy(),
+            # A fresh list is started on every execution, so this one can be handed off
+            rlm_calls=llm_calls,
         )
 
     def __enter__(self):
@@ -299,12 +628,13 @@ class LocalREPL(NonIsolatedEnv):
 
     def cleanup(self):
         """清理临时目录并重置状态。"""
+        if self._lm_pool is not None:
+            self._lm_pool.close()
         try:
             shutil.rmtree(self.temp_dir)
         except Exception:
             pass
-        self.globals.clear()
-        self.locals.clear()
+        self.namespace.clear()
 
     def __del__(self):
         self.cleanup()
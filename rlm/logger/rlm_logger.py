@@ -4,8 +4,11 @@ RLM 迭代的日志记录器。
 将 RLMIteration 数据写入 JSON-lines 文件，用于分析和调试。
 """
 
+import atexit
 import json
 import os
+import queue
+import threading
 import uuid
 from datetime import datetime
 
@@ -26,6 +29,80 @@ class RLMLogger:
         self._iteration_count = 0
         self._metadata_logged = False
 
+        # Keep the file open for the logger's lifetime. Entries are serialized by the caller
+        # and written by a daemon thread, so file I/O never blocks the completion loop.
+        self._fh = open(self.log_file_path, "a", buffering=1 << 16, encoding="utf-8")
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        # Guards _closed so nothing is queued after the close marker
+        self._lock = threading.Lock()
+        self._closed = False
+        # First exception raised by a file write; surfaced by the next log()/flush()/close()
+        self._error: Exception | None = None
+        self._t = threading.Thread(target=self._writer_loop, daemon=True)
+        self._t.start()
+        atexit.register(self.close)
+
+    def _put(self, item):
+        """将条目或标记放入写入队列。日志记录器已关闭或写入曾失败时抛出错误。"""
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"RLMLogger for {self.log_file_path} is closed")
+            self._raise_write_error()
+            self._q.put(item)
+
+    def _raise_write_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.log_file_path} failed") from self._error
+
+    def _write(self, entry: dict):
+        # Serialize here so errors surface in the caller and later mutation can't leak in
+        self._put(json.dumps(entry) + "\n")
+
+    def _writer_loop(self):
+        """
+        后台写入线程：批量取出队列中的条目并写入文件。
+        写入失败时记录错误但继续处理标记，因此 flush()/close() 不会永远阻塞。
+        """
+        while True:
+            items = [self._q.get()]
+            while True:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for item in items:
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                # flush()/close() marker: everything queued before it must be on disk
+                self._write_lines(lines)
+                lines = []
+                if item is None:
+                    self._close_file()
+                    return
+                item.set()
+            self._write_lines(lines)
+
+    def _write_lines(self, lines: list[str]):
+        """写入一批条目。写入失败后不再写入，只保留第一个错误。"""
+        if self._error is not None:
+            return
+        # The thread must keep serving flush()/close() markers, so failures (e.g. OSError from
+        # a full disk) are stored for the caller instead of ending it
+        try:
+            self._fh.write("".join(lines))
+            self._fh.flush()
+        except Exception as e:
+            self._error = e
+
+    def _close_file(self):
+        try:
+            self._fh.close()
+        except Exception as e:
+            self._error = self._error or e
+
     def log_metadata(self, metadata: RLMMetadata):
         """将 RLM 元数据作为文件的第一个条目记录。"""
         if self._metadata_logged:
@@ -37,10 +114,7 @@ class RLMLogger:
             **metadata.to_dict(),
         }
 
-        with open(self.log_file_path, "a") as f:
-            json.dump(entry, f)
-            f.write("\n")
-
+        self._write(entry)
         self._metadata_logged = True
 
     def log(self, iteration: RLMIteration):
@@ -54,9 +128,25 @@ class RLMLogger:
             **iteration.to_dict(),
         }
 
-        with open(self.log_file_path, "a") as f:
-            json.dump(entry, f)
-            f.write("\n")
+        self._write(entry)
+
+    def flush(self):
+        """阻塞直到此前记录的所有条目都已写入磁盘。写入失败时抛出错误。"""
+        written = threading.Event()
+        self._put(written)
+        written.wait()
+        self._raise_write_error()
+
+    def close(self):
+        """写入剩余条目并关闭日志文件。写入失败时抛出错误。"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._q.put(None)
+        self._t.join()
+        atexit.unregister(self.close)
+        self._raise_write_error()
 
     @property
     def iteration_count(self) -> int:
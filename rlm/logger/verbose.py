@@ -6,17 +6,20 @@ RLM 的详细打印功能，使用 rich 库。您可以随意修改这个文件
 使用 "Tokyo Night" 风格的配色方案。
 """
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from rich.console import Console, Group
-from rich.panel import Panel
-from rich.rule import Rule
 from rich.style import Style
-from rich.table import Table
-from rich.text import Text
 
 from rlm.core.types import CodeBlock, RLMIteration, RLMMetadata
 
+if TYPE_CHECKING:
+    from rich.align import Align
+    from rich.console import Console, Group, RenderableType
+    from rich.panel import Panel
+    from rich.rule import Rule
+    from rich.table import Table
+    from rich.text import Text
+
 # ============================================================================
 # Tokyo Night 配色方案
 # ============================================================================
@@ -38,18 +41,70 @@ COLORS = {
 STYLE_PRIMARY = Style(color=COLORS["primary"], bold=True)
 STYLE_SECONDARY = Style(color=COLORS["secondary"])
 STYLE_SUCCESS = Style(color=COLORS["success"])
+STYLE_SUCCESS_BOLD = Style(color=COLORS["success"], bold=True)
 STYLE_WARNING = Style(color=COLORS["warning"])
+STYLE_WARNING_BOLD = Style(color=COLORS["warning"], bold=True)
 STYLE_ERROR = Style(color=COLORS["error"])
 STYLE_TEXT = Style(color=COLORS["text"])
 STYLE_MUTED = Style(color=COLORS["muted"])
 STYLE_ACCENT = Style(color=COLORS["accent"], bold=True)
+STYLE_BORDER = Style(color=COLORS["border"])
+
+# Table column specs: (header, style, width)
+CONFIG_COLUMNS = (
+    ("key", STYLE_MUTED, 16),
+    ("value", STYLE_TEXT, None),
+    ("key2", STYLE_MUTED, 16),
+    ("value2", STYLE_TEXT, None),
+)
+SUMMARY_COLUMNS = (("metric", STYLE_MUTED, None), ("value", STYLE_ACCENT, None))
+
+
+def _load_rich() -> None:
+    """
+    导入 rich 的渲染组件。它们占了导入 rlm 的大部分时间，
+    所以只在启用详细输出时才导入。
+    """
+    global Align, Console, Group, Panel, Rule, Table, Text
+    from rich.align import Align
+    from rich.console import Console, Group
+    from rich.panel import Panel
+    from rich.rule import Rule
+    from rich.table import Table
+    from rich.text import Text
+
+
+def _add_columns(table: "Table", columns: tuple[tuple[str, Style, int | None], ...]) -> None:
+    """按列规格为表格添加列。"""
+    for header, style, width in columns:
+        table.add_column(header, style=style, width=width)
 
 
 def _to_str(value: Any) -> str:
     """安全地将任何值转换为字符串。"""
-    if isinstance(value, str):
-        return value
-    return str(value)
+    return value if type(value) is str else str(value)
+
+
+# 终端只需显示一屏左右的内容；完整内容仍保留在日志中
+_DISPLAY_LIMIT = 4000
+
+
+def _clip(text: str, limit: int = _DISPLAY_LIMIT) -> str:
+    """截断过长的显示文本，避免 rich 为整段字符串排版。"""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n...[省略 {len(text) - limit} 个字符]"
+
+
+# 超过此长度的响应按平均每词 5 个字符估算词数，而不是拆分整个字符串
+_WORD_COUNT_LIMIT = 50000
+
+
+def _word_count(text: str) -> int:
+    """粗略计算单词数。"""
+    if len(text) > _WORD_COUNT_LIMIT:
+        return len(text) // 5
+    return len(text.split())
 
 
 class VerbosePrinter:
@@ -71,8 +126,32 @@ class VerbosePrinter:
             enabled: 是否启用详细打印。如果为 False，所有方法都不执行任何操作。
         """
         self.enabled = enabled
-        self.console = Console() if enabled else None
+        self.console = None
+        # Output redirected to a file or pipe (and not a notebook): skip Rich layout, write plain text
+        self._plain = False
+        if enabled:
+            _load_rich()
+            self.console = Console()
+            self._plain = not (self.console.is_terminal or self.console.is_jupyter)
+            # Built once here rather than per summary; rich is only imported when enabled
+            self._summary_rule = Rule(style=STYLE_BORDER, characters="═")
         self._iteration_count = 0
+        # Renderables (plain strings in plain mode) collected by _emit(), printed by flush()
+        self._buffer: list[RenderableType] = []
+
+    def _emit(self, *renderables: "RenderableType") -> None:
+        """缓冲要输出的内容。console.print 开销很大，因此每个逻辑单元只打印一次。"""
+        self._buffer.extend(renderables)
+
+    def flush(self) -> None:
+        """一次性打印所有缓冲的内容。"""
+        if not self._buffer:
+            return
+        if self._plain:
+            self.console.file.write("\n".join(self._buffer) + "\n")
+        else:
+            self.console.print(Group(*self._buffer))
+        self._buffer.clear()
 
     def print_header(
         self,
@@ -87,11 +166,21 @@ class VerbosePrinter:
         if not self.enabled:
             return
 
+        if self._plain:
+            line = (
+                f"RLM ━ backend={backend} model={model} environment={environment} "
+                f"max_iterations={max_iterations} max_depth={max_depth}"
+            )
+            if other_backends:
+                line += f" sub-models={', '.join(other_backends)}"
+            self._emit(line)
+            self.flush()
+            return
+
         # 主标题
-        title = Text()
-        title.append("◆ ", style=STYLE_ACCENT)
-        title.append("RLM", style=Style(color=COLORS["primary"], bold=True))
-        title.append(" ━ 递归语言模型", style=STYLE_MUTED)
+        title = Text.assemble(
+            ("◆ ", STYLE_ACCENT), ("RLM", STYLE_PRIMARY), (" ━ 递归语言模型", STYLE_MUTED)
+        )
 
         # 配置表格
         config_table = Table(
@@ -101,10 +190,7 @@ class VerbosePrinter:
             padding=(0, 2),
             expand=True,
         )
-        config_table.add_column("key", style=STYLE_MUTED, width=16)
-        config_table.add_column("value", style=STYLE_TEXT)
-        config_table.add_column("key2", style=STYLE_MUTED, width=16)
-        config_table.add_column("value2", style=STYLE_TEXT)
+        _add_columns(config_table, CONFIG_COLUMNS)
 
         config_table.add_row(
             "Backend",
@@ -144,9 +230,8 @@ class VerbosePrinter:
             padding=(1, 2),
         )
 
-        self.console.print()
-        self.console.print(panel)
-        self.console.print()
+        self._emit(Text(), panel, Text())
+        self.flush()
 
     def print_metadata(self, metadata: RLMMetadata) -> None:
         """将 RLM 元数据打印为头部。"""
@@ -171,19 +256,28 @@ class VerbosePrinter:
             return
 
         self._iteration_count = iteration
+        if self._plain:
+            self._emit(f"── 迭代 {iteration} ──")
+            return
 
         rule = Rule(
             Text(f" 迭代 {iteration} ", style=STYLE_PRIMARY),
-            style=COLORS["border"],
+            style=STYLE_BORDER,
             characters="─",
         )
-        self.console.print(rule)
+        self._emit(rule)
 
     def print_completion(self, response: Any, iteration_time: float | None = None) -> None:
         """打印完成响应。"""
         if not self.enabled:
             return
 
+        if self._plain:
+            response_str = _to_str(response)
+            timing = f"  ({iteration_time:.2f}s)" if iteration_time else ""
+            self._emit(f"◇ LLM 响应{timing}", response_str, f"~{_word_count(response_str)} 词")
+            return
+
         # 带时间的头部
         header = Text()
         header.append("◇ ", style=STYLE_ACCENT)
@@ -195,9 +289,7 @@ class VerbosePrinter:
         response_str = _to_str(response)
         response_text = Text(response_str, style=STYLE_TEXT)
 
-        # 粗略计算单词数
-        word_count = len(response_str.split())
-        footer = Text(f"~{word_count} 词", style=STYLE_MUTED)
+        footer = Text(f"~{_word_count(response_str)} 词", style=STYLE_MUTED)
 
         panel = Panel(
             Group(response_text, Text(), footer),
@@ -206,7 +298,7 @@ class VerbosePrinter:
             border_style=COLORS["muted"],
             padding=(0, 1),
         )
-        self.console.print(panel)
+        self._emit(panel)
 
     def print_code_execution(self, code_block: CodeBlock) -> None:
         """打印代码执行详情。"""
@@ -214,11 +306,21 @@ class VerbosePrinter:
             return
 
         result = code_block.result
+        if self._plain:
+            timing = f"  ({result.execution_time:.3f}s)" if result.execution_time else ""
+            self._emit(f"▸ 代码执行{timing}", "代码:", code_block.code)
+            if result.stdout.strip():
+                self._emit("输出:", _clip(result.stdout.rstrip("\n")))
+            if result.stderr.strip():
+                self._emit("错误:", _clip(result.stderr.rstrip("\n")))
+            if result.rlm_calls:
+                self._emit(f"↳ {len(result.rlm_calls)} 个子调用")
+            return
 
         # 头部
         header = Text()
         header.append("▸ ", style=STYLE_SUCCESS)
-        header.append("代码执行", style=Style(color=COLORS["success"], bold=True))
+        header.append("代码执行", style=STYLE_SUCCESS_BOLD)
         if result.execution_time:
             header.append(f"  ({result.execution_time:.3f}s)", style=STYLE_MUTED)
 
@@ -228,23 +330,23 @@ class VerbosePrinter:
         # 代码片段
         code_text = Text()
         code_text.append("代码:\n", style=STYLE_MUTED)
-        code_text.append(_to_str(code_block.code), style=STYLE_TEXT)
+        code_text.append(code_block.code, style=STYLE_TEXT)
         content_parts.append(code_text)
 
         # 如果存在标准输出
-        stdout_str = _to_str(result.stdout) if result.stdout else ""
+        stdout_str = result.stdout
         if stdout_str.strip():
             stdout_text = Text()
             stdout_text.append("\n输出:\n", style=STYLE_MUTED)
-            stdout_text.append(stdout_str, style=STYLE_SUCCESS)
+            stdout_text.append(_clip(stdout_str), style=STYLE_SUCCESS)
             content_parts.append(stdout_text)
 
         # 如果存在标准错误（错误）
-        stderr_str = _to_str(result.stderr) if result.stderr else ""
+        stderr_str = result.stderr
         if stderr_str.strip():
             stderr_text = Text()
             stderr_text.append("\n错误:\n", style=STYLE_MUTED)
-            stderr_text.append(stderr_str, style=STYLE_ERROR)
+            stderr_text.append(_clip(stderr_str), style=STYLE_ERROR)
             content_parts.append(stderr_text)
 
         # 子调用摘要
@@ -260,7 +362,7 @@ class VerbosePrinter:
             border_style=COLORS["success"],
             padding=(0, 1),
         )
-        self.console.print(panel)
+        self._emit(panel)
 
     def print_subcall(
         self,
@@ -273,6 +375,15 @@ class VerbosePrinter:
         if not self.enabled:
             return
 
+        if self._plain:
+            timing = f"  ({execution_time:.2f}s)" if execution_time else ""
+            self._emit(
+                f"  ↳ 子调用: {_to_str(model)}{timing}",
+                f"提示: {_clip(prompt_preview)}",
+                f"响应: {_clip(response_preview)}",
+            )
+            return
+
         # 头部
         header = Text()
         header.append("  ↳ ", style=STYLE_SECONDARY)
@@ -284,9 +395,9 @@ class VerbosePrinter:
         # 内容
         content = Text()
         content.append("提示: ", style=STYLE_MUTED)
-        content.append(_to_str(prompt_preview), style=STYLE_TEXT)
+        content.append(_clip(prompt_preview), style=STYLE_TEXT)
         content.append("\n响应: ", style=STYLE_MUTED)
-        content.append(_to_str(response_preview), style=STYLE_TEXT)
+        content.append(_clip(response_preview), style=STYLE_TEXT)
 
         panel = Panel(
             content,
@@ -295,7 +406,7 @@ class VerbosePrinter:
             border_style=COLORS["secondary"],
             padding=(0, 1),
         )
-        self.console.print(panel)
+        self._emit(panel)
 
     def print_iteration(self, iteration: RLMIteration, iteration_num: int) -> None:
         """
@@ -320,19 +431,23 @@ class VerbosePrinter:
                 self.print_subcall(
                     model=call.root_model,
                     prompt_preview=_to_str(call.prompt) if call.prompt else "",
-                    response_preview=_to_str(call.response) if call.response else "",
+                    response_preview=call.response or "",
                     execution_time=call.execution_time,
                 )
 
+        self.flush()
+
     def print_final_answer(self, answer: Any) -> None:
         """打印最终答案。"""
         if not self.enabled:
             return
 
+        if self._plain:
+            self._emit("★ 最终答案", _to_str(answer))
+            return
+
         # 标题
-        title = Text()
-        title.append("★ ", style=STYLE_WARNING)
-        title.append("最终答案", style=Style(color=COLORS["warning"], bold=True))
+        title = Text.assemble(("★ ", STYLE_WARNING), ("最终答案", STYLE_WARNING_BOLD))
 
         # 答案内容
         answer_text = Text(_to_str(answer), style=STYLE_TEXT)
@@ -345,9 +460,7 @@ class VerbosePrinter:
             padding=(1, 2),
         )
 
-        self.console.print()
-        self.console.print(panel)
-        self.console.print()
+        self._emit(Text(), panel, Text())
 
     def print_summary(
         self,
@@ -359,6 +472,22 @@ class VerbosePrinter:
         if not self.enabled:
             return
 
+        rows = [("迭代次数", str(total_iterations)), ("总时间", f"{total_time:.2f}s")]
+
+        if usage_summary:
+            total_input = total_output = 0
+            for m in usage_summary.get("model_usage_summaries", {}).values():
+                total_input += m.get("total_input_tokens", 0)
+                total_output += m.get("total_output_tokens", 0)
+            if total_input or total_output:
+                rows.append(("输入令牌", f"{total_input:,}"))
+                rows.append(("输出令牌", f"{total_output:,}"))
+
+        if self._plain:
+            self._emit(" | ".join(f"{metric} {value}" for metric, value in rows))
+            self.flush()
+            return
+
         # 摘要表格
         summary_table = Table(
             show_header=False,
@@ -366,28 +495,16 @@ class VerbosePrinter:
             box=None,
             padding=(0, 2),
         )
-        summary_table.add_column("metric", style=STYLE_MUTED)
-        summary_table.add_column("value", style=STYLE_ACCENT)
-
-        summary_table.add_row("迭代次数", str(total_iterations))
-        summary_table.add_row("总时间", f"{total_time:.2f}s")
-
-        if usage_summary:
-            total_input = sum(
-                m.get("total_input_tokens", 0)
-                for m in usage_summary.get("model_usage_summaries", {}).values()
-            )
-            total_output = sum(
-                m.get("total_output_tokens", 0)
-                for m in usage_summary.get("model_usage_summaries", {}).values()
-            )
-            if total_input or total_output:
-                summary_table.add_row("输入令牌", f"{total_input:,}")
-                summary_table.add_row("输出令牌", f"{total_output:,}")
+        _add_columns(summary_table, SUMMARY_COLUMNS)
+        for metric, value in rows:
+            summary_table.add_row(metric, value)
 
         # 包装在规则中
-        self.console.print()
-        self.console.print(Rule(style=COLORS["border"], characters="═"))
-        self.console.print(summary_table, justify="center")
-        self.console.print(Rule(style=COLORS["border"], characters="═"))
-        self.console.print()
+        self._emit(
+            Text(),
+            self._summary_rule,
+            Align.center(summary_table),
+            self._summary_rule,
+            Text(),
+        )
+        self.flush()
@@ -3,27 +3,100 @@ RLM 轨迹的解析工具。
 """
 
 import re
+from collections.abc import Iterable, Iterator
 from typing import TYPE_CHECKING
 
-from rlm.core.types import REPLResult, RLMIteration
+from rlm.core.types import CodeBlock, REPLResult, RLMIteration
 
 if TYPE_CHECKING:
     from rlm.environments.base_env import BaseEnv
 
+# Compiled once at import; these run on every response of every iteration.
+_CODE_BLOCK_RE = re.compile(r"```repl\s*\n(.*?)\n```", re.DOTALL)
+_WHITESPACE_RE = re.compile(r"\s*")
+# FINAL_VAR / FINAL must be at the start of a line
+_FINAL_VAR_RE = re.compile(r"^\s*FINAL_VAR\((.*?)\)", re.MULTILINE | re.DOTALL)
+_FINAL_RE = re.compile(r"^\s*FINAL\((.*?)\)", re.MULTILINE | re.DOTALL)
+
+# Every lazy `(.*?)` above scans forward to its terminator, so an opener with no terminator
+# after it scans to the end of the text, and many such openers make the search quadratic.
+# Matches can only end at the last terminator, so searches are bounded by `endpos` there.
+# Results are unchanged and each search stays linear.
+
+
+def _end_of_last(text: str, terminator: str) -> int:
+    """Return the index just past the last occurrence of terminator (0 if absent)."""
+    index = text.rfind(terminator)
+    return 0 if index == -1 else index + len(terminator)
+
+
+def iter_code_blocks(text: str) -> Iterator[str]:
+    """
+    按顺序逐个生成文本中用三个反引号包裹的 REPL 代码块的内容。
+    只需要前几个代码块的调用方可以提前停止，跳过其余的匹配。
+    """
+    # Plain substring search is far cheaper than the regex on responses without code
+    if "```repl" not in text:
+        return
+
+    for match in _CODE_BLOCK_RE.finditer(text, 0, _end_of_last(text, "\n```")):
+        yield match.group(1).strip()
+
 
 def find_code_blocks(text: str) -> list[str]:
     """
     在文本中查找用三个反引号包裹的 REPL 代码块并返回内容列表。
     如果没有找到代码块，则返回空列表。
     """
-    pattern = r"```repl\s*\n(.*?)\n```"
-    results = []
+    return list(iter_code_blocks(text))
+
 
-    for match in re.finditer(pattern, text, re.DOTALL):
-        code_content = match.group(1).strip()
-        results.append(code_content)
+class StreamingCodeBlockParser:
+    """
+    增量解析流式响应中的 REPL 代码块。每个代码块在其结束的三个反引号到达时
+    立即返回；只有空白的代码块可能被后续文本改变，会等到下一个代码块结束或
+    close() 时才返回。全部结果与对完整响应调用 find_code_blocks() 相同。
+    """
 
-    return results
+    def __init__(self):
+        self.text = ""
+        self._pos = 0  # End of the last complete code block
+
+    def feed(self, chunk: str) -> list[str]:
+        """追加一个响应片段，并返回因此而完整的代码块。"""
+        self.text += chunk
+        # A block can only complete on a chunk that contains a closing backtick
+        if "`" not in chunk:
+            return []
+
+        results = []
+        endpos = _end_of_last(self.text, "\n```")
+        for match in _CODE_BLOCK_RE.finditer(self.text, self._pos, endpos):
+            # The greedy `\s*` prefers the last newline of the whitespace after the opener. If
+            # the block's content is only whitespace, that newline may lie past the one used
+            # here, and a later closing fence would make it the match instead.
+            whitespace_end = _WHITESPACE_RE.match(self.text, match.start(1)).end()
+            if "\n" in self.text[match.start(1) : whitespace_end]:
+                break
+            results.append(match.group(1).strip())
+            self._pos = match.end()
+        return results
+
+    def close(self) -> list[str]:
+        """在响应结束时调用，返回尚未返回的代码块。"""
+        endpos = _end_of_last(self.text, "\n```")
+        results = [
+            match.group(1).strip()
+            for match in _CODE_BLOCK_RE.finditer(self.text, self._pos, endpos)
+        ]
+        self._pos = len(self.text)
+        return results
+
+    def parse(self, chunks: Iterable[str]) -> Iterator[str]:
+        """依次输入响应片段，并在每个代码块完整时立即生成它。"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
 
 
 def find_final_answer(text: str, environment: "BaseEnv | None" = None) -> str | None:
@@ -40,9 +113,13 @@ def find_final_answer(text: str, environment: "BaseEnv | None" = None) -> str |
     返回:
         最终答案字符串，如果未找到最终答案模式则返回 None
     """
+    if "FINAL" not in text:
+        return None
+
+    endpos = _end_of_last(text, ")")
+
     # Check for FINAL_VAR pattern first - must be at start of line
-    final_var_pattern = r"^\s*FINAL_VAR\((.*?)\)"
-    match = re.search(final_var_pattern, text, re.MULTILINE | re.DOTALL)
+    match = _FINAL_VAR_RE.search(text, 0, endpos)
     if match:
         variable_name = match.group(1).strip().strip('"').strip("'")
         if environment is not None:
@@ -54,8 +131,7 @@ def find_final_answer(text: str, environment: "BaseEnv | None" = None) -> str |
         return None
 
     # Check for FINAL pattern - must be at start of line
-    final_pattern = r"^\s*FINAL\((.*?)\)"
-    match = re.search(final_pattern, text, re.MULTILINE | re.DOTALL)
+    match = _FINAL_RE.search(text, 0, endpos)
     if match:
         return match.group(1).strip()
 
@@ -76,24 +152,27 @@ def format_iteration(
     返回:
         要添加到下一个提示的消息列表
     """
-    messages = [{"role": "assistant", "content": iteration.response}]
-
-    for code_block in iteration.code_blocks:
-        code = code_block.code
-        result = code_block.result
-        result = format_execution_result(result)
-        if len(result) > max_character_length:
-            result = (
-                result[:max_character_length]
-                + f"... + [{len(result) - max_character_length} chars...]"
-            )
-
-        execution_message = {
-            "role": "user",
-            "content": f"Code executed:\n```python\n{code}\n```\n\nREPL output:\n{result}",
-        }
-        messages.append(execution_message)
-    return messages
+    return [
+        {"role": "assistant", "content": iteration.response},
+        *(
+            _format_code_block_message(code_block, max_character_length)
+            for code_block in iteration.code_blocks
+        ),
+    ]
+
+
+def _format_code_block_message(code_block: CodeBlock, max_character_length: int) -> dict[str, str]:
+    """将单个代码块及其（截断后的）执行结果格式化为用户消息。"""
+    result = format_execution_result(code_block.result)
+    if len(result) > max_character_length:
+        result = (
+            f"{result[:max_character_length]}... + [{len(result) - max_character_length} chars...]"
+        )
+
+    return {
+        "role": "user",
+        "content": f"Code executed:\n```python\n{code_block.code}\n```\n\nREPL output:\n{result}",
+    }
 
 
 ################
@@ -101,6 +180,10 @@ def format_iteration(
 ################
 
 
+# Only variables of simple types are listed after each execution
+_SHOWN_VAR_TYPES = (str, int, float, bool, list, dict, tuple)
+
+
 def format_execution_result(result: REPLResult) -> str:
     """
     将执行结果格式化为用于显示的字符串。
@@ -108,30 +191,30 @@ def format_execution_result(result: REPLResult) -> str:
     参数:
         result: 要格式化的 REPLResult 对象。
     """
-    result_parts = []
+    # Separators are emitted as separate pieces so the output is copied only once, by the join
+    parts = []
 
     if result.stdout:
-        result_parts.append(f"\n{result.stdout}")
+        parts += ("\n", result.stdout)
 
     if result.stderr:
-        result_parts.append(f"\n{result.stderr}")
-
-    # Show some key variables (excluding internal ones)
-    important_vars = {}
-    for key, value in result.locals.items():
-        if not key.startswith("_") and key not in [
-            "__builtins__",
-            "__name__",
-            "__doc__",
-        ]:
-            # Only show simple types or short representations
-            if isinstance(value, (str, int, float, bool, list, dict, tuple)):
-                important_vars[key] = ""
-
-    if important_vars:
-        result_parts.append(f"REPL variables: {list(important_vars.keys())}\n")
-
-    return "\n\n".join(result_parts) if result_parts else "No output"
+        parts += ("\n\n\n" if parts else "\n", result.stderr)
+
+    # Show the names of key variables (excluding internal ones, which includes dunders)
+    important_keys = [
+        key
+        for key, value in result.locals.items()
+        if not key.startswith("_") and isinstance(value, _SHOWN_VAR_TYPES)
+    ]
+
+    if important_keys:
+        parts += (
+            "\n\nREPL variables: " if parts else "REPL variables: ",
+            repr(important_keys),
+            "\n",
+        )
+
+    return "".join(parts) or "No output"
 
 
 def check_for_final_answer(response: str, repl_env, logger) -> str | None:
@@ -105,6 +105,8 @@ def build_rlm_system_prompt(
         others = len(context_lengths) - 100
         context_lengths = str(context_lengths[:100]) + "... [" + str(others) + " others]"
 
+    # Keep the system message byte-identical across calls so providers can serve it from their
+    # prompt cache; per-query metadata goes in its own message after it.
     metadata_prompt = f"Your context is a {context_type} with {context_total_length} total characters, and is broken up into chunks of char lengths: {context_lengths}."
 
     return [
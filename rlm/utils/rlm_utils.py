@@ -1,12 +1,14 @@
+from functools import lru_cache
 from typing import Any
 
 
+@lru_cache(maxsize=256)
+def _is_sensitive_key(key: str) -> bool:
+    """判断键名是否像 API 密钥（例如 api_key、OPENAI_API_KEY）。"""
+    key_lower = key.lower()
+    return "api" in key_lower and "key" in key_lower
+
+
 def filter_sensitive_keys(kwargs: dict[str, Any]) -> dict[str, Any]:
     """从关键字参数中过滤掉敏感键，如 API 密钥。"""
-    filtered = {}
-    for key, value in kwargs.items():
-        key_lower = key.lower()
-        if "api" in key_lower and "key" in key_lower:
-            continue
-        filtered[key] = value
-    return filtered
+    return {key: value for key, value in kwargs.items() if not _is_sensitive_key(key)}
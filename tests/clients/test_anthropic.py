@@ -0,0 +1,41 @@
+"""Tests for the Anthropic client."""
+
+from unittest.mock import MagicMock, patch
+
+from rlm.clients.anthropic import AnthropicClient
+
+
+class TestAnthropicClientUnit:
+    """Unit tests that don't require API calls."""
+
+    def test_system_prompt_marked_for_caching(self):
+        """Test that the system prompt is sent as a cacheable text block."""
+        with patch("rlm.clients.anthropic.anthropic"):
+            client = AnthropicClient(api_key="test-key", model_name="claude-test")
+        messages, system = client._prepare_messages(
+            [
+                {"role": "system", "content": "You are helpful."},
+                {"role": "user", "content": "Hello"},
+            ]
+        )
+        assert messages == [{"role": "user", "content": "Hello"}]
+        assert system == [
+            {
+                "type": "text",
+                "text": "You are helpful.",
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+    def test_cached_tokens_counted_as_input(self):
+        """Test that cache reads and writes are included in input token usage."""
+        with patch("rlm.clients.anthropic.anthropic"):
+            client = AnthropicClient(api_key="test-key", model_name="claude-test")
+        response = MagicMock()
+        response.usage.input_tokens = 10
+        response.usage.cache_creation_input_tokens = 0
+        response.usage.cache_read_input_tokens = 90
+        response.usage.output_tokens = 5
+        client._track_cost(response, "claude-test")
+        assert client.get_last_usage().total_input_tokens == 100
+        assert client.get_usage_summary().model_usage_summaries["claude-test"].total_calls == 1
@@ -0,0 +1,51 @@
+"""Tests for the OpenAI client."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from rlm.clients.openai import OpenAIClient
+
+
+def make_chunk(content=None, usage=None):
+    """Build a streamed chat completion chunk; the usage chunk has no choices."""
+    chunk = MagicMock()
+    chunk.usage = usage
+    chunk.choices = [] if content is None else [MagicMock()]
+    if content is not None:
+        chunk.choices[0].delta.content = content
+    return chunk
+
+
+class TestOpenAIClientUnit:
+    """Unit tests that don't require API calls."""
+
+    def test_clients_share_http_connection_pool(self):
+        """Test that separate client instances reuse one sync HTTP client."""
+        first = OpenAIClient(api_key="test-key", model_name="gpt-test")
+        second = OpenAIClient(api_key="test-key", model_name="gpt-test")
+        assert first.client._client is second.client._client
+
+    def test_stream_completion_tracks_usage_chunk(self):
+        """Test that streamed content is yielded and usage is read from the final chunk."""
+        client = OpenAIClient(api_key="test-key", model_name="gpt-test")
+        usage = MagicMock(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter(
+            [make_chunk("Hello"), make_chunk(" world"), make_chunk(usage=usage)]
+        )
+        assert "".join(client.stream_completion("hi")) == "Hello world"
+        summary = client.get_usage_summary().model_usage_summaries["gpt-test"]
+        assert (summary.total_calls, summary.total_input_tokens) == (1, 10)
+        assert client.get_last_usage().total_output_tokens == 5
+
+    def test_stream_completion_without_usage_chunk_warns(self):
+        """Test that a stream without usage is counted without tokens instead of failing."""
+        client = OpenAIClient(api_key="test-key", model_name="gpt-test")
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter([make_chunk("Hello")])
+        with pytest.warns(UserWarning, match="No usage data"):
+            assert "".join(client.stream_completion("hi")) == "Hello"
+        summary = client.get_usage_summary().model_usage_summaries["gpt-test"]
+        assert (summary.total_calls, summary.total_input_tokens) == (1, 0)
+        assert client.get_last_usage().total_input_tokens == 0
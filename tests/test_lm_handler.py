@@ -0,0 +1,78 @@
+"""Tests for LMHandler socket request handling."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from rlm.core.comms_utils import (
+    LMConnectionPool,
+    LMRequest,
+    send_lm_request,
+    send_lm_request_batched,
+)
+from rlm.core.lm_handler import LMHandler
+from rlm.environments.local_repl import LocalREPL
+from tests.mock_lm import MockLM
+
+
+class SlowAsyncLM(MockLM):
+    """Mock LM whose async calls sleep briefly and record peak concurrency."""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def acompletion(self, prompt):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return f"echo: {prompt}"
+
+
+class TestLMHandler:
+    """Tests for single and batched requests over the socket."""
+
+    def test_single_request(self):
+        with LMHandler(MockLM()) as handler:
+            response = send_lm_request(handler.address, LMRequest(prompt="hello"))
+        assert response.success
+        assert response.chat_completion.response == "Mock response to: hello"
+
+    def test_batched_preserves_order_and_bounds_concurrency(self):
+        client = SlowAsyncLM()
+        prompts = [f"p{i}" for i in range(10)]
+        with LMHandler(client, max_concurrency=3) as handler:
+            responses = send_lm_request_batched(handler.address, prompts)
+            # A second batch reuses the same event loop
+            send_lm_request_batched(handler.address, prompts)
+        assert [r.chat_completion.response for r in responses] == [f"echo: {p}" for p in prompts]
+        assert client.peak_in_flight == 3
+
+    def test_concurrent_batches_share_concurrency_bound(self):
+        client = SlowAsyncLM()
+        prompts = [f"p{i}" for i in range(10)]
+        with LMHandler(client, max_concurrency=3) as handler:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for _ in range(4):
+                    executor.submit(send_lm_request_batched, handler.address, prompts)
+        assert client.peak_in_flight == 3
+
+    def test_pool_reuses_connection(self):
+        with LMHandler(MockLM()) as handler:
+            pool = LMConnectionPool(handler.address)
+            send_lm_request(handler.address, LMRequest(prompt="a"), pool=pool)
+            sock = pool._idle[0]
+            response = send_lm_request(handler.address, LMRequest(prompt="b"), pool=pool)
+            assert pool._idle == [sock]
+            pool.close()
+        assert response.chat_completion.response == "Mock response to: b"
+
+    def test_local_repl_llm_query(self):
+        with LMHandler(MockLM()) as handler:
+            repl = LocalREPL(lm_handler_address=handler.address)
+            repl.execute_code("a = llm_query('one')\nb = llm_query_batched(['two', 'three'])")
+            assert repl.locals["a"] == "Mock response to: one"
+            assert repl.locals["b"] == ["Mock response to: two", "Mock response to: three"]
+            assert len(repl._lm_pool._idle) == 1
+            repl.cleanup()
@@ -1,6 +1,7 @@
 """Comprehensive tests for LocalREPL environment."""
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from rlm.environments.local_repl import LocalREPL
 
@@ -23,6 +24,40 @@ class TestLocalREPLBasic:
         assert "Hello, World!" in result.stdout
         repl.cleanup()
 
+    def test_print_to_stderr(self):
+        """Test that print(file=sys.stderr) is captured in stderr."""
+        repl = LocalREPL()
+        result = repl.execute_code("import sys\nprint('oops', file=sys.stderr)")
+        assert "oops" in result.stderr
+        assert result.stdout == ""
+        repl.cleanup()
+
+    def test_output_not_written_through_print(self):
+        """Test that pprint and direct sys.stdout/sys.stderr writes are captured."""
+        repl = LocalREPL()
+        result = repl.execute_code(
+            "import pprint, sys\npprint.pprint({'a': 1})\nsys.stdout.write('direct\\n')\n"
+            "sys.stderr.write('warn\\n')\nprint('viaprint')"
+        )
+        assert result.stdout == "{'a': 1}\ndirect\nviaprint\n"
+        assert result.stderr == "warn\n"
+        repl.cleanup()
+
+    def test_concurrent_output_capture(self):
+        """Test that concurrent executions capture only their own output."""
+        repls = [LocalREPL(), LocalREPL()]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = list(
+                pool.map(
+                    lambda i: repls[i].execute_code(f"for _ in range(200):\n    print('r{i}')"),
+                    range(2),
+                )
+            )
+        assert set(results[0].stdout.split()) == {"r0"}
+        assert set(results[1].stdout.split()) == {"r1"}
+        for repl in repls:
+            repl.cleanup()
+
     def test_error_handling(self):
         """Test that errors are captured in stderr."""
         repl = LocalREPL()
@@ -73,6 +108,15 @@ def greet(name):
         assert "Hello, World!" in result.stdout
         repl.cleanup()
 
+    def test_function_sees_later_globals(self):
+        """Test that functions resolve names defined in later executions."""
+        repl = LocalREPL()
+        repl.execute_code("def get_y():\n    return y")
+        repl.execute_code("y = 7")
+        result = repl.execute_code("print(get_y())")
+        assert "7" in result.stdout
+        repl.cleanup()
+
     def test_list_comprehension(self):
         """Test that list comprehensions work."""
         repl = LocalREPL()
@@ -113,6 +157,32 @@ class TestLocalREPLBuiltins:
         repl.cleanup()
 
 
+class TestLocalREPLCodeCache:
+    """Tests for the compiled code cache."""
+
+    def test_repeated_code_reuses_compiled_object(self):
+        """Test that re-running the same source reuses the cached code object."""
+        repl = LocalREPL()
+        repl.execute_code("counter = 0")
+        repl.execute_code("counter += 1")
+        compiled = repl._code_cache["counter += 1"]
+        repl.execute_code("counter += 1")
+        assert repl._code_cache["counter += 1"] is compiled
+        assert repl.locals["counter"] == 2
+        repl.cleanup()
+
+    def test_comment_only_code_skipped(self):
+        """Test that blank and comment-only blocks return without compiling."""
+        repl = LocalREPL()
+        repl.execute_code("x = 1")
+        result = repl.execute_code("  # nothing to do\n\n# still nothing")
+        assert result.stdout == ""
+        assert result.stderr == ""
+        assert result.locals["x"] == 1
+        assert len(repl._code_cache) == 1
+        repl.cleanup()
+
+
 class TestLocalREPLContextManager:
     """Tests for context manager usage."""
 
@@ -174,6 +244,120 @@ class TestLocalREPLContext:
         assert repl.locals["context"] == [1, 2, 3, "four"]
         repl.cleanup()
 
+    def test_context_not_shared_with_caller(self):
+        """Test that mutating context in the REPL does not affect the caller's payload."""
+        payload = {"items": [1, 2]}
+        repl = LocalREPL(context_payload=payload)
+        repl.execute_code("context['items'].append(3)")
+        assert payload == {"items": [1, 2]}
+        repl.cleanup()
+
+    def test_persist_to_disk(self):
+        """Test that persist_to_disk writes the context file into the temp dir."""
+        repl = LocalREPL(context_payload="on disk", persist_to_disk=True)
+        result = repl.execute_code("print(open('context.txt').read())")
+        assert "on disk" in result.stdout
+        repl.cleanup()
+
+
+class TestLocalREPLSetup:
+    """Tests for resetting the namespace via setup()."""
+
+    def test_setup_resets_namespace(self):
+        """Test that setup() clears user variables but keeps the temp dir."""
+        repl = LocalREPL(context_payload="first")
+        temp_dir = repl.temp_dir
+        repl.execute_code("x = 42")
+        repl.setup()
+        repl.load_context("second")
+        assert "x" not in repl.locals
+        assert repl.locals["context"] == "second"
+        assert repl.temp_dir == temp_dir
+        repl.cleanup()
+
+    def test_reset_empties_temp_dir(self):
+        """Test that reset() removes files written by the previous query."""
+        repl = LocalREPL(context_payload="first")
+        repl.execute_code("import os\nos.mkdir('d')\nopen('f.txt', 'w').write('old')")
+        repl.reset("second")
+        assert not {"d", "f.txt"} & set(os.listdir(repl.temp_dir))
+        assert repl.locals["context"] == "second"
+        repl.cleanup()
+
+
+class TestLocalREPLWorkingDirectory:
+    """Tests for running filesystem code in the temp directory."""
+
+    def test_open_writes_to_temp_dir(self):
+        """Test that relative paths resolve against the temp directory."""
+        repl = LocalREPL()
+        repl.execute_code("with open('out.txt', 'w') as f:\n    f.write('hi')")
+        assert os.path.exists(os.path.join(repl.temp_dir, "out.txt"))
+        repl.cleanup()
+
+    def test_function_defined_with_open_runs_in_temp_dir(self):
+        """Test that later calls to functions that use open() still run in the temp directory."""
+        repl = LocalREPL()
+        repl.execute_code(
+            "def save():\n    with open('saved.txt', 'w') as f:\n        f.write('hi')"
+        )
+        repl.execute_code("save()")
+        assert os.path.exists(os.path.join(repl.temp_dir, "saved.txt"))
+        repl.cleanup()
+
+    def test_indirect_call_into_open_runs_in_temp_dir(self):
+        """Test that calling a function that reaches open() through another one is covered."""
+        repl = LocalREPL()
+        repl.execute_code("def a():\n    return b()")
+        repl.execute_code("def b():\n    with open('x.txt', 'w') as f:\n        f.write('hi')")
+        repl.execute_code("a()")
+        assert os.path.exists(os.path.join(repl.temp_dir, "x.txt"))
+        assert not os.path.exists("x.txt")
+        repl.cleanup()
+
+    def test_imported_module_used_later_runs_in_temp_dir(self):
+        """Test that modules imported in one block mark later blocks that use them."""
+        repl = LocalREPL()
+        repl.execute_code("import os as system")
+        repl.execute_code("cwd = system.getcwd()")
+        assert os.path.realpath(repl.locals["cwd"]) == os.path.realpath(repl.temp_dir)
+        repl.cleanup()
+
+
+class TestLocalREPLCodeFootprint:
+    """Tests for the names a code block reads and binds."""
+
+    def test_immutable_context_is_shared(self):
+        """Test that reads of immutable values can be shared between blocks."""
+        repl = LocalREPL(context_payload="some text")
+        footprint = repl.code_footprint("answer = llm_query(context[:4])")
+        assert footprint.writes == {"answer"}
+        assert {"context", "llm_query"} <= footprint.shared
+        assert not footprint.exclusive
+        repl.cleanup()
+
+    def test_mutable_value_is_not_shared(self):
+        """Test that reads of mutable data are recorded but not shared."""
+        repl = LocalREPL(context_payload=["a", "b"])
+        footprint = repl.code_footprint("context.append('c')")
+        assert "context" in footprint.reads
+        assert "context" not in footprint.shared
+        assert not footprint.exclusive
+        repl.cleanup()
+
+    def test_import_is_exclusive(self):
+        """Test that blocks with imports run on their own."""
+        repl = LocalREPL()
+        assert repl.code_footprint("import math\nx = math.pi").exclusive
+        repl.cleanup()
+
+    def test_existing_function_is_exclusive(self):
+        """Test that calling a function from an earlier execution runs on its own."""
+        repl = LocalREPL()
+        repl.execute_code("def helper():\n    return 1")
+        assert repl.code_footprint("y = helper()").exclusive
+        repl.cleanup()
+
 
 class TestLocalREPLCleanup:
     """Tests for cleanup behavior."""
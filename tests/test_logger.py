@@ -0,0 +1,72 @@
+"""Tests for the JSON-lines RLM logger."""
+
+import gc
+import json
+import weakref
+
+import pytest
+
+from rlm.core.types import RLMIteration
+from rlm.logger import RLMLogger
+
+
+def read_entries(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class FailingFile:
+    """File stand-in whose writes fail, like a full disk."""
+
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestRLMLogger:
+    """Tests for RLMLogger background writing and flushing."""
+
+    def test_flush_writes_queued_entries(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        logger.log(RLMIteration(prompt="p", response="thinking", code_blocks=[]))
+        logger.log(RLMIteration(prompt="p", response="done", code_blocks=[], final_answer="42"))
+        logger.flush()
+        entries = read_entries(logger.log_file_path)
+        assert [e["iteration"] for e in entries] == [1, 2]
+        assert entries[-1]["final_answer"] == "42"
+        logger.close()
+
+    def test_close_writes_pending_entries(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        logger.log(RLMIteration(prompt="p", response="thinking", code_blocks=[]))
+        logger.close()
+        assert len(read_entries(logger.log_file_path)) == 1
+
+    def test_log_after_close_raises(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        logger.close()
+        with pytest.raises(ValueError, match="closed"):
+            logger.log(RLMIteration(prompt="p", response="late", code_blocks=[]))
+
+    def test_flush_raises_when_write_fails(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        logger._fh.close()
+        logger._fh = FailingFile()
+        logger.log(RLMIteration(prompt="p", response="thinking", code_blocks=[]))
+        with pytest.raises(RuntimeError, match="failed"):
+            logger.flush()
+        with pytest.raises(RuntimeError, match="failed"):
+            logger.close()
+
+    def test_closed_logger_is_released(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        logger.close()
+        ref = weakref.ref(logger)
+        del logger
+        gc.collect()
+        assert ref() is None
@@ -5,11 +5,13 @@ from unittest.mock import Mock
 from rlm.core.types import CodeBlock, REPLResult, RLMIteration
 from rlm.environments.local_repl import LocalREPL
 from rlm.utils.parsing import (
+    StreamingCodeBlockParser,
     convert_context_for_repl,
     find_code_blocks,
     find_final_answer,
     format_execution_result,
     format_iteration,
+    iter_code_blocks,
 )
 
 
@@ -77,6 +79,65 @@ print(result)
         assert "def factorial(n):" in blocks[0]
         assert "return n * factorial(n - 1)" in blocks[0]
 
+    def test_iter_code_blocks_is_lazy(self):
+        text = "```repl\nx = 1\n```\n```repl\ny = 2\n```"
+        blocks = iter_code_blocks(text)
+        assert next(blocks) == "x = 1"
+        assert list(blocks) == ["y = 2"]
+
+
+class TestUnterminatedPatterns:
+    """Tests that unterminated openers don't change results (searches are bounded)."""
+
+    def test_unclosed_fences_after_complete_block(self):
+        text = "```repl\nx = 1\n```\n" + "a```repl\n" * 1000
+        assert find_code_blocks(text) == ["x = 1"]
+
+    def test_unclosed_final_lines(self):
+        assert find_final_answer("FINAL(x\n" * 1000) is None
+        assert find_final_answer("FINAL(42)\n" + "FINAL(x\n" * 1000) == "42"
+
+
+class TestStreamingCodeBlockParser:
+    """Tests for incremental code block parsing of streamed responses."""
+
+    def test_matches_find_code_blocks_char_by_char(self):
+        text = """Start
+```repl
+a = 1
+```
+middle ```python
+not_repl = True
+```
+```repl
+b = `2`
+```
+```repl
+
+```
+print(1)
+```
+FINAL(done)"""
+        parser = StreamingCodeBlockParser()
+        blocks = []
+        for char in text:
+            blocks.extend(parser.feed(char))
+        blocks.extend(parser.close())
+        assert blocks == find_code_blocks(text)
+        assert parser.text == text
+
+    def test_whitespace_only_block_returned_on_close(self):
+        parser = StreamingCodeBlockParser()
+        assert list(parser.parse(["```repl\n", "\n```", "\ndone"])) == [""]
+        assert find_code_blocks(parser.text) == [""]
+
+    def test_block_returned_when_fence_closes(self):
+        parser = StreamingCodeBlockParser()
+        assert parser.feed("```repl\nx = 1\n") == []
+        assert parser.feed("``") == []
+        assert parser.feed("`\nmore text") == ["x = 1"]
+        assert parser.feed(" and more") == []
+
 
 class TestFindFinalAnswer:
     """Tests for find_final_answer function."""
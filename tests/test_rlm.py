@@ -0,0 +1,268 @@
+"""Tests for the RLM completion loop using a mock LM."""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import rlm.core.rlm as rlm_core
+from rlm.core.types import CodeFootprint, ModelUsageSummary, UsageSummary
+from rlm.logger import RLMLogger
+from tests.mock_lm import MockLM
+
+
+class ScriptedLM(MockLM):
+    """Mock LM that answers every prompt with a fixed response."""
+
+    def __init__(self, response: str = "FINAL(42)"):
+        super().__init__()
+        self.response = response
+        self.calls = 0
+
+    def completion(self, prompt):
+        self.calls += 1
+        return self.response
+
+
+# Set by code executed in the REPL while StreamingLM is still generating
+CODE_EXECUTED = threading.Event()
+
+
+class StreamingLM(ScriptedLM):
+    """Mock LM that streams a code block, then waits for it to run before finishing."""
+
+    def stream_completion(self, prompt):
+        self.calls += 1
+        yield "```repl\nimport tests.test_rlm as t\nt.CODE_EXECUTED.set()\n"
+        yield "```\n"
+        executed_during_stream = CODE_EXECUTED.wait(timeout=5)
+        yield f"FINAL({executed_during_stream})"
+
+
+class ParallelSubcallLM(ScriptedLM):
+    """Mock LM whose sub-calls only succeed if two of them are in flight at once."""
+
+    def __init__(self):
+        super().__init__(
+            "```repl\na = llm_query('first')\n```\n"
+            "```repl\nb = llm_query('second')\n```\n"
+            "```repl\nboth = a + ' ' + b\n```\n"
+            "FINAL_VAR(both)"
+        )
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def completion(self, prompt):
+        if not isinstance(prompt, str):
+            return super().completion(prompt)
+        try:
+            self.barrier.wait()
+            return "parallel"
+        except threading.BrokenBarrierError:
+            return "serial"
+
+
+class LoopBoundLM(ScriptedLM):
+    """Mock LM whose async calls, like an async SDK client, only work on their first loop."""
+
+    def __init__(self):
+        super().__init__(
+            "```repl\nanswers = llm_query_batched(['a', 'b'])\n```\nFINAL_VAR(answers)"
+        )
+        self.loop = None
+
+    def completion(self, prompt):
+        return super().completion(prompt) if not isinstance(prompt, str) else "sub"
+
+    async def acompletion(self, prompt):
+        self.loop = self.loop or asyncio.get_running_loop()
+        if asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError("bound to a different event loop")
+        return self.completion(prompt)
+
+
+class SlowSubcallLM(ScriptedLM):
+    """Mock LM whose sub-calls take half a second to answer."""
+
+    def __init__(self):
+        super().__init__("```repl\nanswer = llm_query('slow')\n```\nFINAL_VAR(answer)")
+
+    def completion(self, prompt):
+        if not isinstance(prompt, str):
+            return super().completion(prompt)
+        time.sleep(0.5)
+        return "slow"
+
+
+def make_rlm(**kwargs) -> rlm_core.RLM:
+    return rlm_core.RLM(backend="openai", backend_kwargs={"model_name": "mock-model"}, **kwargs)
+
+
+class TestRLMCompletion:
+    """Tests for RLM.completion and RLM.acompletion."""
+
+    def test_completion_returns_final_answer(self):
+        with patch.object(rlm_core, "get_client", return_value=ScriptedLM()):
+            result = make_rlm().completion("What is the answer?")
+        assert result.response == "42"
+        assert result.root_model == "mock-model"
+
+    def test_code_executes_while_streaming(self):
+        CODE_EXECUTED.clear()
+        with patch.object(rlm_core, "get_client", return_value=StreamingLM()):
+            result = make_rlm().completion("Run some code")
+        assert result.response == "True"
+
+    def test_independent_code_blocks_run_concurrently(self):
+        with patch.object(rlm_core, "get_client", return_value=ParallelSubcallLM()):
+            result = make_rlm().completion("Ask two questions")
+        assert result.response == "parallel parallel"
+
+    def test_acompletion_runs_concurrently(self):
+        with patch.object(rlm_core, "get_client", side_effect=lambda *_: ScriptedLM()):
+            rlm = make_rlm()
+
+            async def run_all():
+                return await asyncio.gather(*[rlm.acompletion(f"prompt {i}") for i in range(3)])
+
+            results = asyncio.run(run_all())
+        assert [r.response for r in results] == ["42", "42", "42"]
+
+    def test_acompletion_subcalls_do_not_block_the_event_loop(self):
+        with patch.object(rlm_core, "get_client", side_effect=lambda *_: SlowSubcallLM()):
+            rlm = make_rlm()
+
+            async def run_all():
+                return await asyncio.gather(*[rlm.acompletion(f"prompt {i}") for i in range(4)])
+
+            start = time.perf_counter()
+            results = asyncio.run(run_all())
+            elapsed = time.perf_counter() - start
+        assert [r.response for r in results] == ["slow"] * 4
+        assert elapsed < 1.5
+
+    def test_acompletion_batched_subcalls_share_the_client_loop(self):
+        with patch.object(rlm_core, "get_client", return_value=LoopBoundLM()):
+            result = asyncio.run(make_rlm().acompletion("Ask two questions"))
+        assert result.response == "['sub', 'sub']"
+
+
+class TestRLMSession:
+    """Tests for reusing the handler and environment inside `with RLM(...)`."""
+
+    def test_session_reuses_handler_and_environment(self):
+        with patch.object(rlm_core, "get_client", return_value=ScriptedLM()) as get_client:
+            with make_rlm() as rlm:
+                handler = rlm._session_handler
+                environment = rlm._session_environment
+                rlm.completion("first")
+                rlm.completion("second")
+                assert rlm._session_handler is handler
+                assert rlm._session_environment is environment
+                assert environment.locals["context"] == "second"
+            assert get_client.call_count == 1
+        assert rlm._session_handler is None
+        assert rlm._session_environment is None
+
+    def test_session_replays_setup_code(self):
+        client = ScriptedLM("```repl\nprint(helper_value)\n```\nFINAL_VAR(helper_value)")
+        with patch.object(rlm_core, "get_client", return_value=client):
+            with make_rlm(environment_kwargs={"setup_code": "helper_value = 7"}) as rlm:
+                rlm.completion("first")
+                result = rlm.completion("second")
+        assert result.response == "7"
+
+    def test_session_usage_is_per_completion(self):
+        client = ScriptedLM()
+        client.get_usage_summary = lambda: UsageSummary(
+            model_usage_summaries={
+                "mock-model": ModelUsageSummary(
+                    total_calls=client.calls,
+                    total_input_tokens=10 * client.calls,
+                    total_output_tokens=5 * client.calls,
+                )
+            }
+        )
+        with patch.object(rlm_core, "get_client", return_value=client):
+            with make_rlm() as rlm:
+                rlm.completion("first")
+                result = rlm.completion("second")
+        usage = result.usage_summary.model_usage_summaries["mock-model"]
+        assert usage.total_calls == 1
+        assert usage.total_input_tokens == 10
+
+
+class TestRLMCache:
+    """Tests for the on-disk root LM response cache."""
+
+    def test_repeated_prompt_served_from_cache(self, tmp_path):
+        client = ScriptedLM()
+        with patch.object(rlm_core, "get_client", return_value=client):
+            first = make_rlm(cache_dir=str(tmp_path)).completion("What is the answer?")
+            second = make_rlm(cache_dir=str(tmp_path)).completion("What is the answer?")
+        assert first.response == second.response == "42"
+        assert client.calls == 1
+
+    def test_different_prompts_not_shared(self, tmp_path):
+        client = ScriptedLM()
+        with patch.object(rlm_core, "get_client", return_value=client):
+            rlm = make_rlm(cache_dir=str(tmp_path))
+            rlm.completion("first")
+            rlm.completion("second")
+        assert client.calls == 2
+
+
+class TestRLMLogging:
+    """Tests for iteration logging from the completion loop."""
+
+    def test_log_written_when_completion_returns(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        with patch.object(rlm_core, "get_client", return_value=ScriptedLM()):
+            make_rlm(logger=logger).completion("What is the answer?")
+        with open(logger.log_file_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        assert [e["type"] for e in entries] == ["metadata", "iteration"]
+        assert entries[-1]["final_answer"] == "42"
+        logger.close()
+
+    def test_log_written_when_acompletion_returns(self, tmp_path):
+        logger = RLMLogger(log_dir=str(tmp_path))
+        with patch.object(rlm_core, "get_client", return_value=ScriptedLM()):
+            asyncio.run(make_rlm(logger=logger).acompletion("What is the answer?"))
+        with open(logger.log_file_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        assert [e["type"] for e in entries] == ["metadata", "iteration"]
+        logger.close()
+
+
+class TestScheduleBlock:
+    """Tests for ordering code blocks by the names they read and bind."""
+
+    def footprint(self, reads=(), writes=(), shared=(), exclusive=False):
+        return CodeFootprint(frozenset(reads), frozenset(writes), frozenset(shared), exclusive)
+
+    def test_independent_blocks_have_no_dependencies(self):
+        earlier = [self.footprint(reads={"context"}, writes={"a"}, shared={"context"})]
+        block = self.footprint(reads={"context"}, writes={"b"}, shared={"context"})
+        assert rlm_core._schedule_block(block, earlier)[1] == []
+
+    def test_block_waits_for_names_it_reads(self):
+        earlier = [self.footprint(writes={"a"}), self.footprint(writes={"b"})]
+        assert rlm_core._schedule_block(self.footprint(reads={"b"}), earlier)[1] == [1]
+
+    def test_shared_mutable_value_orders_blocks(self):
+        earlier = [self.footprint(reads={"items"}, writes={"a"})]
+        assert rlm_core._schedule_block(self.footprint(reads={"items"}), earlier)[1] == [0]
+
+    def test_calling_earlier_function_takes_its_footprint(self):
+        earlier = [
+            self.footprint(reads={"totals"}, writes={"add"}),
+            self.footprint(reads={"totals"}, writes={"totals"}),
+        ]
+        footprint, dependencies = rlm_core._schedule_block(self.footprint(reads={"add"}), earlier)
+        assert "totals" in footprint.reads
+        assert dependencies == [0, 1]
+
+    def test_unknown_footprint_runs_in_order(self):
+        earlier = [self.footprint(writes={"a"}), None]
+        assert rlm_core._schedule_block(self.footprint(writes={"b"}), earlier) == (None, [0, 1])
@@ -0,0 +1,96 @@
+"""Tests for the Rich verbose printer."""
+
+import io
+
+from rich.console import Console
+
+from rlm.core.types import CodeBlock, REPLResult, RLMIteration
+from rlm.logger import VerbosePrinter
+
+
+def make_printer() -> tuple[VerbosePrinter, io.StringIO]:
+    output = io.StringIO()
+    printer = VerbosePrinter(enabled=True)
+    printer.console = Console(file=output, width=80)
+    printer._plain = False
+    return printer, output
+
+
+def make_iteration() -> RLMIteration:
+    result = REPLResult(stdout="3\n", stderr="", locals={}, execution_time=0.01)
+    return RLMIteration(
+        prompt="p",
+        response="Let me compute.",
+        code_blocks=[CodeBlock(code="print(1 + 2)", result=result)],
+        iteration_time=0.5,
+    )
+
+
+class TestVerbosePrinter:
+    """Tests for VerbosePrinter output."""
+
+    def test_iteration_printed_in_one_call(self):
+        printer, output = make_printer()
+        calls = []
+        print_ = printer.console.print
+        printer.console.print = lambda *args, **kwargs: calls.append(print_(*args, **kwargs))
+        printer.print_iteration(make_iteration(), 1)
+        assert len(calls) == 1
+        text = output.getvalue()
+        assert "Let me compute." in text
+        assert "print(1 + 2)" in text
+
+    def test_plain_output_when_not_a_terminal(self):
+        output = io.StringIO()
+        printer = VerbosePrinter(enabled=True)
+        printer.console = Console(file=output)
+        printer._plain = True
+        printer.print_iteration(make_iteration(), 1)
+        printer.print_summary(1, 0.5)
+        assert output.getvalue().splitlines() == [
+            "── 迭代 1 ──",
+            "◇ LLM 响应  (0.50s)",
+            "Let me compute.",
+            "~3 词",
+            "▸ 代码执行  (0.010s)",
+            "代码:",
+            "print(1 + 2)",
+            "输出:",
+            "3",
+            "迭代次数 1 | 总时间 0.50s",
+        ]
+
+    def test_summary_totals_tokens_across_models(self):
+        output = io.StringIO()
+        printer = VerbosePrinter(enabled=True)
+        printer.console = Console(file=output)
+        printer._plain = True
+        usage = {
+            "model_usage_summaries": {
+                "root": {"total_input_tokens": 1000, "total_output_tokens": 20},
+                "sub": {"total_input_tokens": 500, "total_output_tokens": 5},
+            }
+        }
+        printer.print_summary(2, 1.0, usage)
+        assert output.getvalue().strip() == (
+            "迭代次数 2 | 总时间 1.00s | 输入令牌 1,500 | 输出令牌 25"
+        )
+
+    def test_long_output_clipped_for_display(self):
+        output = io.StringIO()
+        printer = VerbosePrinter(enabled=True)
+        printer.console = Console(file=output)
+        printer._plain = True
+        iteration = make_iteration()
+        iteration.code_blocks[0].result.stdout = "x" * 5000
+        printer.print_code_execution(iteration.code_blocks[0])
+        printer.flush()
+        text = output.getvalue()
+        assert "x" * 4001 not in text
+        assert "...[省略 1000 个字符]" in text
+
+    def test_disabled_printer_prints_nothing(self):
+        printer = VerbosePrinter(enabled=False)
+        printer.print_iteration(make_iteration(), 1)
+        printer.print_summary(1, 0.5)
+        assert printer.console is None